@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+# benchmarks.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Benchmarks of trendpy, run with airspeed velocity (asv run).
+
+Series are synthetic piecewise polynomials plus noise, and the example
+data set shipped in example/data.csv.
+"""
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+
+from numpy import arange, cumsum, genfromtxt, zeros
+from numpy.random import RandomState
+
+import trendpy
+
+from trendpy.samplers import L1
+from trendpy.solvers import L1PDIP
+from trendpy.variational import VariationalBayes
+from trendpy.storage import MemoryStorage, DiskStorage, SummaryStorage
+
+sizes = [100, 1000, 10000, 100000]
+orders = [1, 2, 3]
+
+example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'example','data.csv')
+
+def piecewise_polynomial(size, order, knots=10, noise=0.1, seed=0):
+	""" Piecewise polynomial series of degree order-1 plus gaussian noise.
+
+	:param size: length of the series.
+	:type size: int
+	:param order: order of the total variation penalty the series is sparse for.
+	:type order: int
+	:param knots: number of changes in the (order-1)-th derivative.
+	:type knots: int
+	:param noise: standard deviation of the noise relative to the signal.
+	:type noise: float
+	:param seed: seed of the random numbers.
+	:type seed: int
+	:return: series
+	:rtype: `numpy.array`
+	"""
+	random = RandomState(seed)
+	jumps = zeros(size)
+	jumps[random.choice(arange(1,size),size=min(knots,size-1),replace=False)] = random.standard_normal(min(knots,size-1))
+	signal = jumps
+	for _ in range(order):
+		signal = cumsum(signal)
+	signal = (signal-signal.mean())/(signal.std() or 1.)
+	return signal+noise*random.standard_normal(size)
+
+class TimeFilter:
+	""" trendpy.filter by series length and total variation order."""
+
+	params = (sizes, orders)
+	param_names = ['size', 'order']
+	timeout = 600
+
+	def setup(self, size, order):
+		self.data = piecewise_polynomial(size,order)
+
+	def time_filter(self, size, order):
+		trendpy.filter(self.data,number_simulations=20,burns=10,total_variation=order,seed=0)
+
+	def peakmem_filter(self, size, order):
+		trendpy.filter(self.data,number_simulations=20,burns=10,total_variation=order,seed=0)
+
+class TimeFilterSimulations:
+	""" trendpy.filter by number of simulations and storage of the traces."""
+
+	params = ([20, 100, 500], ['summary', 'memory', 'disk'])
+	param_names = ['number_simulations', 'storage']
+	timeout = 600
+
+	def setup(self, number_simulations, storage):
+		self.data = piecewise_polynomial(1000,2)
+		self.directory = tempfile.mkdtemp()
+
+	def teardown(self, number_simulations, storage):
+		shutil.rmtree(self.directory,ignore_errors=True)
+
+	def storage(self, storage, burns):
+		if storage == 'memory':
+			return MemoryStorage()
+		elif storage == 'disk':
+			return DiskStorage(self.directory)
+		return SummaryStorage(burns)
+
+	def time_filter(self, number_simulations, storage):
+		burns = number_simulations//2
+		trendpy.filter(self.data,number_simulations=number_simulations,burns=burns,seed=0,storage=self.storage(storage,burns))
+
+	def peakmem_filter(self, number_simulations, storage):
+		burns = number_simulations//2
+		trendpy.filter(self.data,number_simulations=number_simulations,burns=burns,seed=0,storage=self.storage(storage,burns))
+
+class TimeL1Updates:
+	""" Single Gibbs updates of the L1 sampler, by parameter."""
+
+	params = (sizes, orders, ['trend', 'sigma2', 'lambda2', 'omega'])
+	param_names = ['size', 'order', 'parameter']
+
+	def setup(self, size, order, parameter):
+		self.sampler = L1(piecewise_polynomial(size,order),total_variation_order=order,seed=0)
+		for name in self.sampler.parameters.hierarchy:
+			self.sampler.parameters.list[name].current_value = self.sampler.initial_value(name)
+		for name in self.sampler.parameters.hierarchy:
+			self.sampler.parameters.list[name].current_value = self.sampler.generate(name)
+
+	def time_distribution_parameters(self, size, order, parameter):
+		self.sampler.cache.clear()
+		self.sampler.distribution_parameters(parameter)
+
+	def time_generate(self, size, order, parameter):
+		self.sampler.cache.clear()
+		self.sampler.generate(parameter)
+
+	def peakmem_generate(self, size, order, parameter):
+		self.sampler.cache.clear()
+		self.sampler.generate(parameter)
+
+class TimeExample:
+	""" trendpy.filter on the example data set."""
+
+	params = [1, 2, 3]
+	param_names = ['order']
+	timeout = 600
+
+	def setup(self, order):
+		self.data = genfromtxt(example,delimiter=',',skip_header=1,usecols=1)
+
+	def time_filter(self, order):
+		trendpy.filter(self.data,number_simulations=100,burns=50,total_variation=order,seed=0)
+
+	def peakmem_filter(self, order):
+		trendpy.filter(self.data,number_simulations=100,burns=50,total_variation=order,seed=0)
+
+class TimeL1PDIP:
+	""" Deterministic L1 trend filter by series length and order."""
+
+	params = (sizes, orders)
+	param_names = ['size', 'order']
+
+	def setup(self, size, order):
+		self.solver = L1PDIP(piecewise_polynomial(size,order),total_variation_order=order)
+		self.penalty = 0.01*self.solver.penalty_max
+
+	def time_solve(self, size, order):
+		self.solver.solve(self.penalty)
+
+	def peakmem_solve(self, size, order):
+		self.solver.solve(self.penalty)
+
+class TimeVariationalBayes:
+	""" Mean-field approximation of the L1 posterior by series length and order."""
+
+	params = (sizes, orders)
+	param_names = ['size', 'order']
+
+	def setup(self, size, order):
+		self.sampler = L1(piecewise_polynomial(size,order),total_variation_order=order)
+
+	def time_run(self, size, order):
+		VariationalBayes(self.sampler).run()
+
+	def peakmem_run(self, size, order):
+		VariationalBayes(self.sampler).run()
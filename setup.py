@@ -94,11 +94,12 @@ def setup_package():
           include_package_data = True,
           platforms = 'any',
 		  packages=['trendpy'],
-          install_requires = ['numpy',
+          install_requires = ['numpy>=1.17',
                               'scipy',
                               'pandas',
                               'seaborn',
 							  'tabulate'],
+          extras_require = {'jit': ['numba']},
           classifiers = [
             'Development Status :: 2 - Pre-Alpha',
             'Environment :: Web Environment',
@@ -26,18 +26,61 @@
 
 from __future__ import absolute_import
 
-from collections import Mapping
+try:
+	from collections.abc import Mapping
+except ImportError:
+	from collections import Mapping
 
-from trendpy.globals import *
+import importlib
 
 from trendpy.version import version
-from trendpy.factory import SamplerFactory
-from trendpy.mcmc import MCMC
 
+# the submodule trendpy.globals shadows the builtin once imported
+_namespace = globals()
+
+# numpy and scipy take most of the import time: the submodules, and the
+# names imported from them below, are only loaded on first access
+_submodules = ('diagnostics','factory','globals','jit','mcmc','online','parallel','rng','samplers','solvers','storage','variational')
+
+_attributes = {'SamplerFactory' : 'factory',
+	'MCMC' : 'mcmc',
+	'OnlineFilter' : 'online',
+	'rolling_filter' : 'online',
+	'Solver' : 'solvers',
+	'SummaryStorage' : 'storage',
+	'MemoryStorage' : 'storage',
+	'derivative_matrix' : 'globals',
+	'difference_coefficients' : 'globals',
+	'banded_gram' : 'globals',
+	'banded_outer_gram' : 'globals',
+	'banded_inverse' : 'globals',
+	'cached_derivative_matrix' : 'globals',
+	'cached_banded_outer_gram' : 'globals',
+	'tosequence' : 'globals'}
+
+# a star import only resolves the lazy names listed here
+__all__ = ['filter','filter_many']+list(_attributes)
+
+def __getattr__(name):
+	if name in _submodules:
+		return importlib.import_module('trendpy.'+name)
+	if name in _attributes:
+		value = getattr(importlib.import_module('trendpy.'+_attributes[name]),name)
+		_namespace[name] = value
+		return value
+	raise AttributeError("module 'trendpy' has no attribute '%s'" % name)
+
+def __dir__():
+	return sorted(set(_namespace)|set(_submodules)|set(_attributes))
 
 __version__ = version
 
-def filter(data, method="L1", number_simulations=100, burns=50, total_variation=2, max_restart=5, verbose=0):
+def _filter_segment(arguments):
+	""" Filters one segment of a long series (executed in a worker process)."""
+	data, options = arguments
+	return filter(data, **options)
+
+def filter(data, method="L1", number_simulations=100, burns=50, total_variation=2, max_restart=5, verbose=0, chains=1, n_jobs=1, seed=None, storage=None, stopping_rule=None, penalty=None, segment_length=None, overlap=100, dtype=None, backend='numpy'):
 	""" Filters the trend of the time series.
 
 	:param data: 1D time series to be filtered
@@ -46,23 +89,126 @@ def filter(data, method="L1", number_simulations=100, burns=50, total_variation=
 	:type method: str, optional
 	:param number_simulations: number of simulations in the MCMC algorithm
 	:type number_simulations: int, optional
-	:param burns: number of draws dismissed as burning samples
+	:param burns: number of draws dismissed as burning samples (fewer than
+		number_simulations)
 	:type burns: int, optional
-	:param max_restart: number of times the MCMC routine is allowed to restart.
+	:param max_restart: number of times a failed draw is retried.
 	:type max_restart: int
 	:param verbose: control console log information detail.
 	:type verbose: int
+	:param chains: number of independent chains (their draws are pooled).
+	:type chains: int, optional
+	:param n_jobs: number of processes running the chains (-1 uses all the cores).
+	:type n_jobs: int, optional
+	:param seed: seed of the random number generator.
+	:type seed: int, optional
+	:param storage: where the draws are kept (only their running mean after
+		the burning samples is kept if None).
+	:type storage: `trendpy.storage.MemoryStorage`, optional
+	:param stopping_rule: convergence criterion stopping the simulations early
+		(the draws are then kept in memory unless a storage is given).
+	:type stopping_rule: `trendpy.diagnostics.StoppingRule`, optional
+	:param penalty: regularization parameter of the deterministic solvers such
+		as "L1PDIP", or 'bic' or 'aic' to select it (ignored by the samplers).
+	:type penalty: float or str, optional
+	:param segment_length: splits series longer than segment_length in
+		overlapping segments of that length, filtered independently on
+		n_jobs processes and stitched by averaging the trends over the
+		overlaps with tapered weights. The other options apply to each
+		segment (the chains of a segment then run in its process).
+	:type segment_length: int, optional
+	:param overlap: number of observations shared by consecutive segments.
+	:type overlap: int, optional
+	:param dtype: type of the data, draws and traces of the samplers (float64
+		if None); float32 halves their memory, the linear systems being
+		still solved in float64.
+	:type dtype: `Numpy.dtype`, optional
+	:param backend: 'numba' runs the Gibbs sweep of the L1 sampler in a
+		compiled kernel (needs numba, see :py:attr:`trendpy.samplers.L1.backend`).
+	:type backend: str, optional
 	:return: Iterable of the same type with initial data and trend filtered time series.
 	:rtype: `iterable`
 	"""
-	mcmc = MCMC(SamplerFactory.create(method,_tosequence(data),total_variation_order=total_variation))
-	mcmc.run(number_simulations=number_simulations,max_restart=max_restart,verbose=verbose)
+	from numpy import asarray
+	from trendpy.factory import SamplerFactory
+	from trendpy.mcmc import MCMC
+	from trendpy.parallel import parallel_map, spawn_seeds, segment_bounds, stitch_segments
+	from trendpy.solvers import Solver
+	from trendpy.storage import SummaryStorage, MemoryStorage
+
+	if segment_length is not None and segment_length < len(data):
+		values = asarray(data,dtype=float).ravel()
+		bounds = segment_bounds(len(values),segment_length,overlap)
+		options = {'method' : method, 'number_simulations' : number_simulations, 'burns' : burns, 'total_variation' : total_variation, 'max_restart' : max_restart, 'verbose' : verbose, 'chains' : chains, 'storage' : storage, 'stopping_rule' : stopping_rule, 'penalty' : penalty, 'dtype' : dtype, 'backend' : backend}
+		tasks = [(values[start:end], dict(options,seed=s)) for ((start, end), s) in zip(bounds,spawn_seeds(seed,len(bounds)))]
+		pieces = parallel_map(_filter_segment,tasks,n_jobs)
+		return stitch_segments(pieces,bounds).reshape((-1,)+pieces[0].shape[1:])
+	model = SamplerFactory.create(method,_tosequence(data),total_variation_order=total_variation,penalty=penalty,dtype=dtype,backend=backend)
+	if isinstance(model, Solver):
+		# one column, like the trend of the samplers
+		return model.solve().reshape((-1,1))
+	if burns >= number_simulations:
+		raise ValueError("The %i burning samples leave no draw out of %i simulations" % (burns,number_simulations))
+	mcmc = MCMC(model)
+	if storage is None:
+		storage = SummaryStorage(burns) if stopping_rule is None else MemoryStorage()
+	mcmc.run(number_simulations=number_simulations,max_restart=max_restart,verbose=verbose,chains=chains,n_jobs=n_jobs,seed=seed,storage=storage,stopping_rule=stopping_rule)
 	trend = mcmc.output(burns,"trend")
 	return trend
 
+def filter_many(data, number_simulations=100, burns=50, total_variation=2, max_restart=5, verbose=0, chains=1, n_jobs=1, seed=None, storage=None, dtype=None):
+	""" Filters the trends of several time series of the same length.
+
+	The series are filtered jointly by a single sampler whose updates are
+	vectorized across series, which is much faster than calling
+	:py:func:`filter` on each of them. Note that a failed draw is retried
+	for all the series.
+
+	:param data: time series to be filtered, one per column
+	:type data: 2D array or pandas.DataFrame
+	:param number_simulations: number of simulations in the MCMC algorithm
+	:type number_simulations: int, optional
+	:param burns: number of draws dismissed as burning samples (fewer than
+		number_simulations)
+	:type burns: int, optional
+	:param total_variation: order of the total variation penalty
+	:type total_variation: int, optional
+	:param max_restart: number of times a failed draw is retried.
+	:type max_restart: int
+	:param verbose: control console log information detail.
+	:type verbose: int
+	:param chains: number of independent chains (their draws are pooled).
+	:type chains: int, optional
+	:param n_jobs: number of processes running the chains (-1 uses all the cores).
+	:type n_jobs: int, optional
+	:param seed: seed of the random number generator.
+	:type seed: int, optional
+	:param storage: where the draws are kept (only their running mean after
+		the burning samples is kept if None).
+	:type storage: `trendpy.storage.MemoryStorage`, optional
+	:param dtype: type of the data, draws and traces (float64 if None).
+	:type dtype: `Numpy.dtype`, optional
+	:return: trends with the same shape as data (a DataFrame if data is one).
+	:rtype: `Numpy.dnarray` or `pandas.DataFrame`
+	"""
+	from numpy import asarray
+	from trendpy.factory import SamplerFactory
+	from trendpy.mcmc import MCMC
+	from trendpy.storage import SummaryStorage
+
+	if burns >= number_simulations:
+		raise ValueError("The %i burning samples leave no draw out of %i simulations" % (burns,number_simulations))
+	mcmc = MCMC(SamplerFactory.create("BatchL1",data,total_variation_order=total_variation,dtype=dtype))
+	storage = storage if storage is not None else SummaryStorage(burns)
+	mcmc.run(number_simulations=number_simulations,max_restart=max_restart,verbose=verbose,chains=chains,n_jobs=n_jobs,seed=seed,storage=storage)
+	trend = mcmc.output(burns,"trend")
+	if hasattr(data,'columns'):
+		return data.__class__(trend,index=data.index,columns=data.columns)
+	return trend.reshape(asarray(data).shape)
 
 def _tosequence(X):
     """Turn X into a sequence or ndarray.""" #(code taken from scikit-learn)
+    from trendpy.globals import tosequence
     if isinstance(X, Mapping):  # single sample
         return [X]
     else:
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# diagnostics.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+from numpy import sqrt, concatenate, asarray, abs, cumprod, maximum
+from numpy.fft import rfft, irfft
+
+__all__ = ['split_rhat','effective_sample_size','monte_carlo_standard_error','geweke','StoppingRule']
+
+def split_rhat(trace):
+	""" Computes the split potential scale reduction factor (R-hat) of
+		Gelman et al. Each chain is cut in two halves and the between-half
+		variance is compared to the within-half variance; values close
+		to 1 indicate that the chains have mixed.
+
+	:param trace: draws with shape (..., number_draws, number_chains).
+	:type trace: `Numpy.dnarray`
+	:return: R-hat statistic for each coordinate of the parameter.
+	:rtype: `Numpy.dnarray`
+	"""
+	half = trace.shape[-2]//2
+	if half < 2:
+		raise ValueError("At least 4 draws per chain are needed to compute R-hat")
+	halves = concatenate((trace[...,:half,:],trace[...,-half:,:]),axis=-1)
+	chain_means = halves.mean(axis=-2)
+	within = halves.var(axis=-2,ddof=1).mean(axis=-1)
+	between = half*chain_means.var(axis=-1,ddof=1)
+	pooled = (half-1.)/half*within+between/half
+	return sqrt(pooled/within)
+
+def effective_sample_size(trace):
+	""" Computes the effective sample size of a chain from its
+		autocorrelations, truncated with Geyer's initial positive
+		sequence estimator.
+
+	:param trace: draws with shape (..., number_draws).
+	:type trace: `Numpy.dnarray`
+	:return: effective sample size of each coordinate of the parameter.
+	:rtype: `Numpy.dnarray`
+	"""
+	x = asarray(trace,dtype=float)
+	n = x.shape[-1]
+	if n < 4:
+		raise ValueError("At least 4 draws are needed to compute the effective sample size")
+	x = x-x.mean(axis=-1,keepdims=True)
+	spectrum = rfft(x,n=2*n,axis=-1)
+	autocovariance = irfft(spectrum*spectrum.conjugate(),axis=-1)[...,:n]
+	variance = maximum(autocovariance[...,:1],1e-300)
+	autocorrelation = autocovariance/variance
+	pairs = autocorrelation[...,:2*(n//2)].reshape(x.shape[:-1]+(n//2,2)).sum(axis=-1)
+	positive = cumprod(pairs > 0,axis=-1)
+	tau = maximum(-1+2*(pairs*positive).sum(axis=-1),1./n)
+	return n/tau
+
+def monte_carlo_standard_error(trace):
+	""" Computes the Monte Carlo standard error of the posterior mean with
+		the batch means method (batches of sqrt(n) draws).
+
+	:param trace: draws with shape (..., number_draws).
+	:type trace: `Numpy.dnarray`
+	:return: standard error of the mean of each coordinate of the parameter.
+	:rtype: `Numpy.dnarray`
+	"""
+	x = asarray(trace,dtype=float)
+	n = x.shape[-1]
+	size = int(sqrt(n))
+	batches = n//size
+	if batches < 2:
+		raise ValueError("At least 4 draws are needed to compute the Monte Carlo standard error")
+	x = x[...,n-batches*size:]
+	means = x.reshape(x.shape[:-1]+(batches,size)).mean(axis=-1)
+	return sqrt(size*means.var(axis=-1,ddof=1)/(batches*size))
+
+def geweke(trace, first=0.1, last=0.5):
+	""" Computes Geweke's convergence z-scores comparing the mean of the
+		first and last parts of a chain.
+
+	:param trace: draws with shape (..., number_draws).
+	:type trace: `Numpy.dnarray`
+	:param first: fraction of the draws in the first part.
+	:type first: float, optional
+	:param last: fraction of the draws in the last part.
+	:type last: float, optional
+	:return: z-score of each coordinate of the parameter.
+	:rtype: `Numpy.dnarray`
+	"""
+	x = asarray(trace,dtype=float)
+	n = x.shape[-1]
+	a = x[...,:int(first*n)]
+	b = x[...,n-int(last*n):]
+	error = sqrt(monte_carlo_standard_error(a)**2+monte_carlo_standard_error(b)**2)
+	return (a.mean(axis=-1)-b.mean(axis=-1))/maximum(error,1e-300)
+
+class StoppingRule(object):
+	""" Convergence criterion used to stop the MCMC algorithm early.
+
+	The rule is checked on the draws of one parameter after the burning
+	samples:
+
+	* ``'ess'``: the smallest effective sample size is above the threshold,
+	* ``'geweke'``: the largest absolute Geweke z-score is below the threshold,
+	* ``'mcse'``: the largest Monte Carlo standard error relative to the
+	  posterior standard deviation is below the threshold.
+
+	Examples
+	--------
+
+	>>> mcmc.run(5000,5,0,stopping_rule=StoppingRule('ess',200,burn=100))
+	>>> mcmc.iteration
+	"""
+
+	thresholds = {'ess' : 200., 'geweke' : 2., 'mcse' : 0.05}
+
+	def __init__(self, criterion='ess', threshold=None, parameter='trend', burn=0, check_every=100):
+		""" Creates a stopping rule.
+
+		:param criterion: one of 'ess', 'geweke' or 'mcse'.
+		:type criterion: str, optional
+		:param threshold: target value of the criterion (default depends on the criterion).
+		:type threshold: float, optional
+		:param parameter: name of the monitored parameter.
+		:type parameter: str, optional
+		:param burn: number of draws dismissed as burning samples.
+		:type burn: int, optional
+		:param check_every: number of draws between two checks.
+		:type check_every: int, optional
+		"""
+		if not criterion in StoppingRule.thresholds:
+			raise ValueError("Unknown criterion: %s" % criterion)
+		self.criterion = criterion
+		self.threshold = threshold if threshold is not None else StoppingRule.thresholds[criterion]
+		self.parameter = parameter
+		self.burn = burn
+		self.check_every = check_every
+
+	def statistic(self, trace):
+		""" Computes the monitored statistic.
+
+		:param trace: draws of the parameter with shape (..., number_draws).
+		:type trace: `Numpy.dnarray`
+		:return: worst value of the criterion over the coordinates.
+		:rtype: float
+		"""
+		x = asarray(trace[...,self.burn:],dtype=float)
+		if self.criterion == 'ess':
+			return effective_sample_size(x).min()
+		elif self.criterion == 'geweke':
+			return abs(geweke(x)).max()
+		return (monte_carlo_standard_error(x)/maximum(x.std(axis=-1),1e-300)).max()
+
+	def __call__(self, trace):
+		""" Checks whether the chain can be stopped.
+
+		:param trace: draws of the parameter with shape (..., number_draws).
+		:type trace: `Numpy.dnarray`
+		:return: True if the criterion is met.
+		:rtype: bool
+		"""
+		if trace.shape[-1]-self.burn < 20:
+			return False
+		value = self.statistic(trace)
+		if self.criterion == 'ess':
+			return value >= self.threshold
+		return value <= self.threshold
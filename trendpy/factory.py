@@ -27,6 +27,7 @@
 from __future__ import absolute_import
 
 from trendpy.samplers import *
+from trendpy.solvers import *
 
 class SamplerFactory:
 	factories = {}
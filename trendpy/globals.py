@@ -26,35 +26,180 @@
 
 from __future__ import absolute_import
 
-from collections import Sequence
-from numpy import zeros, asarray, ndarray
+try:
+	from collections.abc import Sequence
+except ImportError:
+	from collections import Sequence
 
-__all__ = ['derivative_matrix','tosequence']
+from functools import lru_cache
 
-def derivative_matrix(size, order=2):
+from numpy import zeros, ones, asarray, ndarray, arange, float64
+from scipy.sparse import diags
+from scipy.special import comb
+
+__all__ = ['derivative_matrix','difference_coefficients','banded_gram','banded_outer_gram','banded_inverse','cached_derivative_matrix','cached_banded_outer_gram','tosequence']
+
+#: number of (size, order) pairs whose operators are kept in memory
+OPERATOR_CACHE_SIZE = 64
+
+def difference_coefficients(order=2):
+	""" Computes the coefficients of the forward difference of a given order.
+
+	:param order: derivation order.
+	:type order: int
+	:return: the order+1 binomial coefficients with alternating signs
+	:rtype: `Numpy.dnarray`
+	"""
+	k = arange(order+1)
+	return comb(order, k, exact=False)*(-1.0)**(order-k)
+
+def derivative_matrix(size, order=2, sparse=False):
 	""" Computes a discrete difference operator.
 
+	The operator is banded: each row holds the order+1 difference
+	coefficients. With ``sparse=True`` it is returned in CSR format
+	and only O(size*order) memory is used.
+
 	:param size: dimension of the matrix.
 	:type size: int
 	:param order: derivation order.
 	:type order: int
+	:param sparse: returns a `Scipy.sparse.csr_matrix` if True.
+	:type sparse: bool
 	:return: Discrete difference operator
+	:rtype: `Numpy.dnarray` or `Scipy.sparse.csr_matrix`
+	"""
+	d = difference_coefficients(order)
+	if sparse:
+		return diags(list(d), list(range(order+1)), shape=(size-order, size), format='csr')
+	D = zeros((size-order, size))
+	rows = arange(size-order)
+	for l in range(order+1):
+		D[rows, rows+l] = d[l]
+	return D
+
+def banded_gram(size, order=2, weights=None):
+	""" Computes D'diag(weights)D in upper banded storage, D being the
+	discrete difference operator of dimension (size-order) x size.
+
+	The matrix has order super-diagonals and is stored as expected by
+	`Scipy.linalg.cholesky_banded`: ``ab[order+i-j,j] == a[i,j]``.
+	Building it costs O(size*order^2) and never forms D.
+
+	:param size: dimension of the matrix.
+	:type size: int
+	:param order: derivation order.
+	:type order: int
+	:param weights: weights of the size-order differences (ones if None).
+		A 2D array of shape (size-order, n) gives n matrices stacked on
+		the last axis.
+	:type weights: array, optional
+	:return: banded representation of D'diag(weights)D
 	:rtype: `Numpy.dnarray`
 	"""
-	D=zeros((size-order, size))
-	if order==0:
-		d=[1]
-	elif order==1:
-		d=[-1,1]
-	elif order==2:
-		d=[1,-2,1]
-	elif order==3:
-		d=[-1,3,-3,1]
-	for n in range(size-order):
-		for l in range(order+1):
-			D[n,n+l]=d[l]
+	d = difference_coefficients(order)
+	rows = size-order
+	w = ones(rows) if weights is None else asarray(weights, dtype=float)
+	ab = zeros((order+1, size)+w.shape[1:])
+	for k in range(order+1):
+		for a in range(order+1-k):
+			ab[order-k, a+k:a+k+rows] += d[a]*d[a+k]*w
+	return ab
+
+def banded_outer_gram(size, order=2):
+	""" Computes DD' in upper banded storage, D being the discrete difference
+	operator of dimension (size-order) x size.
+
+	DD' is a Toeplitz matrix of dimension size-order with order
+	super-diagonals, stored as expected by `Scipy.linalg.cholesky_banded`.
+
+	:param size: number of columns of D.
+	:type size: int
+	:param order: derivation order.
+	:type order: int
+	:return: banded representation of DD'
+	:rtype: `Numpy.dnarray`
+	"""
+	d = difference_coefficients(order)
+	ab = zeros((order+1, size-order))
+	for k in range(order+1):
+		ab[order-k, k:] = (d[:order+1-k]*d[k:]).sum()
+	return ab
+
+def _read_only(*arrays):
+	for array in arrays:
+		array.flags.writeable = False
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def cached_derivative_matrix(size, order=2):
+	""" Sparse discrete difference operator shared by every caller asking
+	for the same size and order (see :py:func:`derivative_matrix`).
+
+	The operators are kept in a process-wide least recently used cache of
+	OPERATOR_CACHE_SIZE entries, which cached_derivative_matrix.cache_clear()
+	empties. They are read-only: copy them before any in place change.
+
+	:param size: dimension of the matrix.
+	:type size: int
+	:param order: derivation order.
+	:type order: int
+	:return: Discrete difference operator
+	:rtype: `Scipy.sparse.csr_matrix`
+	"""
+	D = derivative_matrix(size, order, sparse=True)
+	_read_only(D.data, D.indices, D.indptr)
 	return D
 
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def cached_banded_outer_gram(size, order=2):
+	""" Read-only DD' in upper banded storage, shared by every caller asking
+	for the same size and order (see :py:func:`banded_outer_gram` and
+	:py:func:`cached_derivative_matrix`).
+
+	:param size: number of columns of D.
+	:type size: int
+	:param order: derivation order.
+	:type order: int
+	:return: banded representation of DD'
+	:rtype: `Numpy.dnarray`
+	"""
+	ab = banded_outer_gram(size, order)
+	_read_only(ab)
+	return ab
+
+def banded_inverse(cholesky):
+	""" Computes the entries of the inverse of a banded symmetric positive
+	definite matrix that lie in its band, from its upper Cholesky factor
+	(Takahashi recursion).
+
+	The inverse is dense but, for instance, the variances of a gaussian
+	vector with banded precision and the covariances of its neighbours
+	only involve the band. It costs O(size*order^2) and is compiled when
+	Numba is installed (about a hundred times faster).
+
+	:param cholesky: upper Cholesky factor in banded storage, as returned
+		by `Scipy.linalg.cholesky_banded`.
+	:type cholesky: `Numpy.dnarray`
+	:return: band of the inverse in the same storage
+	:rtype: `Numpy.dnarray`
+	"""
+	# imported here, numba taking longer to import than the rest of trendpy
+	from trendpy.jit import NUMBA_AVAILABLE, banded_inverse as compiled
+	if NUMBA_AVAILABLE:
+		return compiled(asarray(cholesky,dtype=float64))
+	order = cholesky.shape[0]-1
+	size = cholesky.shape[1]
+	U = cholesky.tolist()
+	Z = [[0.]*size for _ in range(order+1)]
+	for i in range(size-1,-1,-1):
+		last = min(i+order,size-1)
+		for j in range(last,i-1,-1):
+			total = 0.
+			for l in range(i+1,last+1):
+				total += U[order+i-l][l]*(Z[order+l-j][j] if l <= j else Z[order+j-l][l])
+			Z[order+i-j][j] = ((1./U[order][i] if i == j else 0.)-total)/U[order][i]
+	return asarray(Z)
+
 def tosequence(x):
     """Cast iterable x to a Sequence. (Code from scikit-learn)
 
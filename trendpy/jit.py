@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+# jit.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Compiled kernels of the L1 Gibbs sweep.
+
+They are compiled with Numba when it is installed (NUMBA_AVAILABLE) and
+are plain Python functions otherwise, which are far too slow to be used
+but keep the kernels testable. The samplers only call them when Numba
+is available.
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+
+try:
+	from numba import njit
+	NUMBA_AVAILABLE = True
+except ImportError:
+	NUMBA_AVAILABLE = False
+
+	def njit(*args, **kwargs):
+		if len(args) == 1 and callable(args[0]):
+			return args[0]
+		return lambda function: function
+
+__all__ = ['NUMBA_AVAILABLE','banded_cholesky','forward_substitution','backward_substitution','banded_inverse','l1_sweep']
+
+@njit(cache=True)
+def banded_cholesky(ab):
+	""" Upper Cholesky factor of a symmetric positive definite matrix in
+		upper banded storage (as `Scipy.linalg.cholesky_banded`).
+
+	:param ab: upper banded storage of the matrix.
+	:type ab: `Numpy.dnarray`
+	:return: whether the matrix is numerically positive definite, and the factor
+	:rtype: tuple
+	"""
+	order = ab.shape[0]-1
+	size = ab.shape[1]
+	cb = np.zeros_like(ab)
+	for j in range(size):
+		total = ab[order,j]
+		for k in range(max(0,j-order),j):
+			total -= cb[order+k-j,j]**2
+		if not total > 0:
+			return False, cb
+		pivot = np.sqrt(total)
+		cb[order,j] = pivot
+		for i in range(j+1,min(j+order,size-1)+1):
+			total = ab[order+j-i,i]
+			for k in range(max(0,i-order),j):
+				total -= cb[order+k-j,j]*cb[order+k-i,i]
+			cb[order+j-i,i] = total/pivot
+	return True, cb
+
+@njit(cache=True)
+def forward_substitution(cb, b):
+	""" Solves U'x = b, U being an upper banded Cholesky factor."""
+	order = cb.shape[0]-1
+	size = cb.shape[1]
+	x = np.empty(size)
+	for i in range(size):
+		total = b[i]
+		for k in range(max(0,i-order),i):
+			total -= cb[order+k-i,i]*x[k]
+		x[i] = total/cb[order,i]
+	return x
+
+@njit(cache=True)
+def backward_substitution(cb, b):
+	""" Solves Ux = b, U being an upper banded Cholesky factor."""
+	order = cb.shape[0]-1
+	size = cb.shape[1]
+	x = np.empty(size)
+	for i in range(size-1,-1,-1):
+		total = b[i]
+		for k in range(i+1,min(i+order,size-1)+1):
+			total -= cb[order+i-k,k]*x[k]
+		x[i] = total/cb[order,i]
+	return x
+
+@njit(cache=True)
+def banded_inverse(cb):
+	""" Band of the inverse of U'U, U being an upper banded Cholesky factor
+		(see :py:func:`trendpy.globals.banded_inverse`)."""
+	order = cb.shape[0]-1
+	size = cb.shape[1]
+	z = np.zeros_like(cb)
+	for i in range(size-1,-1,-1):
+		last = min(i+order,size-1)
+		for j in range(last,i-1,-1):
+			total = 0.
+			for l in range(i+1,last+1):
+				if l <= j:
+					total += cb[order+i-l,l]*z[order+l-j,j]
+				else:
+					total += cb[order+i-l,l]*z[order+j-l,l]
+			z[order+i-j,j] = ((1./cb[order,i] if i == j else 0.)-total)/cb[order,i]
+	return z
+
+@njit(cache=True)
+def _wald(mean, shape):
+	# Michael, Schucany and Haas, as np.random.wald, with the root of
+	# y^2+4*shape*y-y rationalized: numba's wald returns zeros when
+	# mean/shape exceeds about 1e8, which the omega draws routinely do
+	y = mean*np.random.standard_normal()**2
+	root = np.sqrt(y*y+4*shape*y)
+	x = mean*4*shape*y/(y+root)**2 if y > 0 else mean
+	if np.random.random() <= mean/(mean+x):
+		return x
+	return mean*mean/x
+
+@njit(cache=True)
+def l1_sweep(seed, data, sigma2, lambda2, omega, coefficients, alpha, rho, lower, upper):
+	""" Draws trend, sigma2, lambda2 and omega in turn from the conditional
+		distributions of :py:class:`trendpy.samplers.L1`.
+
+	:param seed: seed of the random numbers of the sweep.
+	:type seed: int
+	:param data: observations.
+	:type data: `Numpy.dnarray`
+	:param sigma2: current sigma2.
+	:type sigma2: float
+	:param lambda2: current lambda2 (the trend is drawn first and does not depend on it).
+	:type lambda2: float
+	:param omega: current omega.
+	:type omega: `Numpy.dnarray`
+	:param coefficients: coefficients of the difference operator.
+	:type coefficients: `Numpy.dnarray`
+	:param alpha: shape of the prior of lambda2.
+	:type alpha: float
+	:param rho: rate of the prior of lambda2.
+	:type rho: float
+	:param lower: lower bound of the draws of omega.
+	:type lower: float
+	:param upper: upper bound of the draws of omega.
+	:type upper: float
+	:return: whether the precision of the trend could be factorized, and
+		the new trend, sigma2, lambda2 and omega
+	:rtype: tuple
+	"""
+	np.random.seed(seed)
+	order = coefficients.shape[0]-1
+	size = data.shape[0]
+	count = size-order
+	# trend: gaussian with precision (I+D'diag(1/omega)D)/sigma2
+	ab = np.zeros((order+1,size))
+	ab[order,:] = 1.
+	for i in range(count):
+		weight = 1./omega[i]
+		for a in range(order+1):
+			for b in range(a,order+1):
+				ab[order-(b-a),i+b] += coefficients[a]*coefficients[b]*weight
+	positive, cb = banded_cholesky(ab)
+	if not positive:
+		return False, data, sigma2, lambda2, omega
+	mean = backward_substitution(cb,forward_substitution(cb,data))
+	noise = backward_substitution(cb,np.random.standard_normal(size))
+	trend = mean+np.sqrt(sigma2)*noise
+	differences = np.zeros(count)
+	for i in range(count):
+		for a in range(order+1):
+			differences[i] += coefficients[a]*trend[i+a]
+	# sigma2: inverse gamma
+	scale = 0.
+	for i in range(size):
+		scale += 0.5*(data[i]-trend[i])**2
+	for i in range(count):
+		scale += 0.5*differences[i]**2/omega[i]
+	sigma2 = scale/np.random.gamma(size,1.)
+	# lambda2: gamma shifted by the penalty of the differences
+	loc = rho
+	for i in range(count):
+		loc += 0.5*abs(differences[i])/sigma2
+	lambda2 = loc+np.random.gamma(count-1+alpha,1.)
+	# omega: reciprocal of inverse gaussian draws, clipped to [lower, upper]
+	tiny = 2.2250738585072014e-308 # smallest positive normal double
+	shape = lambda2**2
+	new = np.empty(count)
+	for i in range(count):
+		mu = np.exp(np.log(lambda2)+0.5*np.log(sigma2)-0.5*np.log(max(differences[i]**2,tiny)))
+		draw = _wald(mu*shape,shape)
+		if draw < 1./upper:
+			new[i] = upper
+		elif draw > 1./lower:
+			new[i] = lower
+		else:
+			new[i] = 1./draw
+	return True, trend, sigma2, lambda2, new
@@ -26,13 +26,109 @@
 
 from __future__ import absolute_import
 
-from numpy import reshape, zeros
+import os
+import pickle
+import logging
+
+from time import perf_counter
+
+from copy import deepcopy
+
+from numpy import reshape, concatenate, isfinite, float64
+
+from trendpy.diagnostics import split_rhat
+from trendpy.parallel import parallel_map, spawn_seeds
+from trendpy.storage import MemoryStorage, DiskStorage, SummaryStorage, Summary
+from trendpy.rng import RandomGenerator
+
+logger = logging.getLogger(__name__)
+
+def _report(level, message, *args):
+	""" Emits a progress message of a verbose run on the trendpy.mcmc
+		logger, or prints it as earlier versions did when logging is not
+		configured (no handler on the logger or its ancestors).
+	"""
+	if logger.hasHandlers():
+		logger.log(level, message, *args)
+	else:
+		print(message % args)
+
+def _run_chain(arguments):
+	""" Runs one independent chain (executed in a worker process)."""
+	sampler, number_simulations, max_restart, verbose, seed, initial_values, storage, dtype = arguments
+	mcmc = MCMC(deepcopy(sampler))
+	mcmc.run(number_simulations, max_restart, verbose, seed=seed, initial_values=initial_values, storage=deepcopy(storage), dtype=dtype)
+	return mcmc.simulations
+
+class ConvergenceError(ValueError):
+	""" Raised when the draw of a parameter keeps failing.
+
+	:param parameter_name: name of the parameter whose draw failed.
+	:type parameter_name: str
+	:param error: error raised by the last attempt.
+	:type error: Exception
+	"""
+
+	def __init__(self, parameter_name, error):
+		ValueError.__init__(self, "Convergence error: the draw of %s failed (%s)" % (parameter_name,error))
+		self.parameter_name = parameter_name
+		self.error = error
+
+class RunStats(object):
+	""" Statistics collected while running the MCMC algorithm: time spent
+		computing the posterior distribution parameters and drawing each
+		parameter, restarts, steps per second and peak memory of the traces.
+
+		With the (opt-in) numba backend of :py:class:`trendpy.samplers.L1`
+		the whole sweep is timed under the single name 'sweep', the
+		per-parameter times being only recorded when it falls back to
+		drawing the parameters one by one.
+	"""
+
+	def __init__(self):
+		self.distribution_time = {}
+		self.generate_time = {}
+		self.restarts = {}
+		self.steps = 0
+		self.elapsed = 0.
+		self.peak_trace_memory = 0
+
+	@property
+	def steps_per_second(self):
+		""" Number of Gibbs sweeps per second."""
+		return self.steps/self.elapsed if self.elapsed > 0 else 0.
+
+	def record(self, parameter_name, distribution_time, generate_time):
+		""" Accounts for the update of a parameter.
+
+		:param parameter_name: name of the parameter.
+		:type parameter_name: str
+		:param distribution_time: seconds spent in distribution_parameters.
+		:type distribution_time: float
+		:param generate_time: seconds spent drawing the parameter.
+		:type generate_time: float
+		"""
+		self.distribution_time[parameter_name] = self.distribution_time.get(parameter_name,0.)+distribution_time
+		self.generate_time[parameter_name] = self.generate_time.get(parameter_name,0.)+generate_time
+
+	def restart(self, parameter_name):
+		""" Accounts for a failed (and retried) draw of a parameter."""
+		self.restarts[parameter_name] = self.restarts.get(parameter_name,0)+1
+
+	def __str__(self):
+		descr = 'steps: %i, steps per second: %.1f, peak trace memory: %i bytes\n' % (self.steps,self.steps_per_second,self.peak_trace_memory)
+		descr += '\n'.join(['%s: distribution %.3fs, generate %.3fs, restarts %i' % (name,self.distribution_time[name],self.generate_time.get(name,0.),self.restarts.get(name,0)) for name in self.distribution_time])
+		return descr
 
 class MCMC(object):
 
 	def __init__(self, sampler):
 		self.sampler = sampler
 		self.simulations = None
+		self.iteration = 0
+		self.converged = False
+		self.storage = MemoryStorage()
+		self.stats = None
 
 	def define_parameters(self):
 		""" Method to set the parameter set to be updated
@@ -85,43 +181,255 @@ class MCMC(object):
 		:return: output of the MCMC algorithm
 		:rtype: `Numpy.dnarray`
         """
+		if isinstance(self.simulations[parameter_name],Summary):
+			return self.simulations[parameter_name].posterior_mean(burn)
 		return self.sampler.output(self.simulations, burn, parameter_name)
 
-	def run(self, number_simulations, max_restart, verbose):
+	def rhat(self, burn, parameter_name):
+		""" Computes the split R-hat convergence diagnostic of a parameter.
+
+		:param burn: number of draws dismissed as burning samples
+		:type burn: int
+		:param parameter_name: name of the parameter of interest
+		:type parameter_name: string
+		:return: R-hat of each coordinate of the parameter
+		:rtype: `Numpy.dnarray`
+        """
+		trace = self.simulations[parameter_name]
+		if trace.ndim == 3:
+			trace = trace[...,None]
+		# row blocks so that traces stored on disk are read piecewise
+		return concatenate([split_rhat(trace[start:start+1024,:,burn:]) for start in range(0,trace.shape[0],1024)])
+
+	def save(self, path):
+		""" Saves the state of the chain: the current value of every
+			parameter, the state of the random number generator and the
+			draws simulated so far.
+
+		:param path: path of the checkpoint file.
+		:type path: str
+		"""
+		state = {'sampler' : self.sampler, 'storage' : self.storage, 'simulations' : self.storage.dump(self.simulations), 'iteration' : self.iteration}
+		with open(path+'.tmp','wb') as f:
+			pickle.dump(state,f,protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(path+'.tmp',path)
+
+	@staticmethod
+	def load(path):
+		""" Restores a chain saved with :py:meth:`save`. The chain can be
+			resumed or extended by calling :py:meth:`run` with resume=True.
+
+		:param path: path of the checkpoint file.
+		:type path: str
+		:return: the restored MCMC algorithm
+		:rtype: `trendpy.mcmc.MCMC`
+		"""
+		with open(path,'rb') as f:
+			state = pickle.load(f)
+		mcmc = MCMC(state['sampler'])
+		mcmc.storage = state['storage']
+		mcmc.simulations = mcmc.storage.restore(state['simulations'])
+		mcmc.iteration = state['iteration']
+		return mcmc
+
+	def run(self, number_simulations, max_restart, verbose, chains=1, n_jobs=1, seed=None, initial_values=None, resume=False, checkpoint=None, checkpoint_every=100, storage=None, stopping_rule=None, stats=False, callback=None, dtype=None):
 		""" Runs the MCMC algorithm.
 
+		When several chains are requested they are run independently
+		(on a process pool if n_jobs > 1), each with its own random stream
+		derived from seed, and their draws are stacked along a fourth
+		(chains) axis of the simulations.
+
 		:param number_simulations: number of random draws for each parameter.
 		:type number_simulations: int
-		:param max_restart: number of times the MCMC routine is allowed to restart.
+		:param max_restart: number of times a failed draw is retried.
 		:type max_restart: int
-		:param verbose: control console log information detail.
+		:param verbose: control log information detail (messages are printed,
+			or emitted on the trendpy.mcmc logger once logging is configured,
+			the step numbers at level INFO and the parameters and retries at
+			level DEBUG).
 		:type verbose: int
+		:param chains: number of independent chains.
+		:type chains: int, optional
+		:param n_jobs: number of worker processes (-1 uses all the cores).
+		:type n_jobs: int, optional
+		:param seed: seed of the random number generator of the sampler
+			(the generator of the sampler is left as is if None).
+		:type seed: int, optional
+		:param initial_values: values from which the chain starts, by parameter
+			name (e.g. the last state of a previous run). Missing parameters
+			start from :py:meth:`initial_value`.
+		:type initial_values: dict, optional
+		:param resume: continues the chain from its current state (after an
+			interrupted run or to extend a finished one) up to
+			number_simulations draws in total, without burning again.
+		:type resume: bool, optional
+		:param checkpoint: path where the chain is saved every
+			checkpoint_every draws and at the end of the run.
+		:type checkpoint: str, optional
+		:param checkpoint_every: number of draws between two checkpoints.
+		:type checkpoint_every: int, optional
+		:param storage: where the draws are kept (in memory if None, see
+			:py:class:`trendpy.storage.DiskStorage` to keep them on disk and
+			:py:class:`trendpy.storage.SummaryStorage` to only keep their
+			running mean and variance).
+		:type storage: `trendpy.storage.MemoryStorage`, optional
+		:param stopping_rule: convergence criterion checked periodically; the
+			run stops as soon as it is met, the traces are then truncated and
+			:py:attr:`iteration` holds the number of draws actually simulated.
+		:type stopping_rule: `trendpy.diagnostics.StoppingRule`, optional
+		:param stats: collects a :py:class:`RunStats` in :py:attr:`stats`.
+		:type stats: bool, optional
+		:param callback: function called after each step with the number of
+			completed steps and the :py:class:`RunStats` of the run (implies
+			stats=True).
+		:type callback: callable, optional
+		:param dtype: type of the draws kept in the traces (the dtype of the
+			sampler if None, float64 if it has none); float32 halves the memory
+			of the traces.
+		:type dtype: `Numpy.dtype`, optional
 		"""
-		self.simulations = {key : zeros((param.size[0],param.size[1],number_simulations)) for (key, param) in self.sampler.parameters.list.items()}
+		if storage is not None:
+			self.storage = storage
+		if isinstance(self.storage,SummaryStorage) and self.storage.burn >= number_simulations:
+			raise ValueError("The %i burning samples leave no draw out of %i simulations" % (self.storage.burn,number_simulations))
+
+		if chains > 1:
+			if resume or checkpoint is not None or stopping_rule is not None:
+				raise ValueError("Checkpoints and stopping rules are only supported for a single chain")
+			if isinstance(self.storage,DiskStorage):
+				raise ValueError("Several chains can not be stored on disk")
+			tasks = [(self.sampler, number_simulations, max_restart, verbose, s, initial_values, self.storage, dtype) for s in spawn_seeds(seed, chains)]
+			results = parallel_map(_run_chain, tasks, n_jobs)
+			self.simulations = {key : self.storage.merge([result[key] for result in results]) for key in results[0]}
+			return
+
+		if stopping_rule is not None and isinstance(self.storage,SummaryStorage):
+			raise ValueError("Stopping rules need the traces of the draws")
+
+		self.converged = False
+		self.stats = RunStats() if stats or callback is not None else None
+		resume = resume and self.simulations is not None
+		if resume:
+			for (key, trace) in self.simulations.items():
+				self.simulations[key] = self.storage.resize(key,trace,number_simulations)
+		else:
+			dtype = dtype if dtype is not None else getattr(self.sampler,'dtype',float64)
+			self.simulations = {key : self.storage.allocate(key,(param.size[0],param.size[1],number_simulations),dtype) for (key, param) in self.sampler.parameters.list.items()}
+
+		start = perf_counter()
+		for sample in self.iter_samples(number_simulations,max_restart,verbose,seed=seed,initial_values=initial_values,resume=resume):
+			for (name, value) in sample.items():
+				self.storage.write(name,self.simulations[name],self.iteration-1,value.reshape(self.sampler.parameters.list[name].size))
+			if self.stats is not None:
+				self.stats.steps += 1
+				self.stats.elapsed = perf_counter()-start
+				self.stats.peak_trace_memory = max(self.stats.peak_trace_memory,self.storage.memory(self.simulations))
+				if callback is not None:
+					callback(self.iteration,self.stats)
+			if checkpoint is not None and (self.iteration % checkpoint_every == 0 or self.iteration == number_simulations):
+				self.save(checkpoint)
+			if stopping_rule is not None and self.iteration % stopping_rule.check_every == 0:
+				self.storage.flush()
+				if stopping_rule(self.simulations[stopping_rule.parameter][:,:,:self.iteration]):
+					self.converged = True
+					self.simulations = {key : trace[:,:,:self.iteration] for (key, trace) in self.simulations.items()}
+					if checkpoint is not None:
+						self.save(checkpoint)
+					break
+		self.storage.flush()
+
+	def iter_samples(self, number_simulations=None, max_restart=5, verbose=0, seed=None, initial_values=None, resume=False):
+		""" Runs the MCMC algorithm step by step, yielding the state of the
+			chain after each completed step. Nothing is stored: the draws can
+			be reduced or forwarded by the caller, who can also stop
+			iterating at any time.
 
+		Examples
+		--------
+
+		>>> for i, sample in enumerate(mcmc.iter_samples(seed=1)):
+		...     if i >= burns:
+		...         total += sample['trend']
+
+		:param number_simulations: number of steps (unbounded if None).
+		:type number_simulations: int, optional
+		:param max_restart: number of times a failed draw is retried.
+		:type max_restart: int, optional
+		:param verbose: control console log information detail.
+		:type verbose: int, optional
+		:param seed: seed of the random number generator of the sampler.
+		:type seed: int, optional
+		:param initial_values: values from which the chain starts, by parameter name.
+		:type initial_values: dict, optional
+		:param resume: continues the chain from its current state.
+		:type resume: bool, optional
+		:return: generator of dictionaries with the current value of each
+			parameter (the arrays are not modified by later steps).
+		:rtype: generator
+		"""
+		if seed is not None:
+			self.sampler.random = RandomGenerator(seed)
+
+		if not resume:
+			self.iteration = 0
+			initial_values = initial_values if initial_values is not None else {}
+			for name in self.sampler.parameters.hierarchy:
+				self.sampler.parameters.list[name].current_value = initial_values[name] if name in initial_values else self.initial_value(name)
+
+		while number_simulations is None or self.iteration < number_simulations:
+			self.step(max_restart,verbose)
+			self.iteration += 1
+			yield {name : self.sampler.parameters.list[name].current_value for name in self.sampler.parameters.hierarchy}
+
+	def step(self, max_restart, verbose):
+		""" Updates every parameter once, following the hierarchy.
+
+		Samplers with a compiled sweep (see
+		:py:meth:`trendpy.samplers.Sampler.sweep`) draw all the parameters at
+		once. Otherwise, or if the compiled sweep fails, the parameters are
+		drawn one by one: a failed draw (an exception or a non finite value)
+		is then retried for the parameter that failed only, the parameters
+		already updated in the step being kept.
+
+		:param max_restart: number of times a failed draw is retried.
+		:type max_restart: int
+		:param verbose: control console log information detail.
+		:type verbose: int
+		:raises ConvergenceError: if a draw still fails after max_restart retries.
+		"""
+		i = self.iteration
+		if verbose > 0:
+			_report(logging.INFO, "== step %i ==", i+1)
+		begin = perf_counter()
+		values = self.sampler.sweep()
+		if values is not None and all(isfinite(value).all() for value in values.values()):
+			if self.stats is not None:
+				self.stats.record('sweep',0.,perf_counter()-begin)
+			for (name, value) in values.items():
+				self.sampler.parameters.list[name].current_value = value
+			return
 		for name in self.sampler.parameters.hierarchy:
-			self.sampler.parameters.list[name].current_value = self.initial_value(name)
-
-		for i in range(number_simulations):
-			if verbose > 0:
-				print("== step %i ==" % (int(i+1),))
-			restart = 0
-			restart_step = True
-			while restart_step:
-				for name in self.sampler.parameters.hierarchy:
-					if verbose > 3:
-						print("== parameter %s ==" % name)
-					try:
-						self.sampler.parameters.list[name].current_value = self.generate(name)
-						self.simulations[name][:,:,i] = self.sampler.parameters.list[name].current_value.reshape(self.sampler.parameters.list[name].size)
-						restart_step = False
-						restart = 0
-					except:
-						if restart < max_restart:
-							restart+=1
-							if verbose > 4:
-								print("== restart step %i ==" % i)
-							restart_step = True
-							break
-						else:
-							raise ValueError("Convergence error")
+			if verbose > 3:
+				_report(logging.DEBUG, "== parameter %s ==", name)
+			for attempt in range(max_restart+1):
+				try:
+					if self.stats is None:
+						value = self.generate(name)
+					else:
+						begin = perf_counter()
+						parameters = self.distribution_parameters(name)
+						middle = perf_counter()
+						value = self.sampler.generate(name,parameters)
+						self.stats.record(name,middle-begin,perf_counter()-middle)
+					if not isfinite(value).all():
+						raise FloatingPointError("non finite draw")
+					break
+				except Exception as error:
+					if self.stats is not None:
+						self.stats.restart(name)
+					if attempt == max_restart:
+						raise ConvergenceError(name,error)
+					if verbose > 4:
+						_report(logging.DEBUG, "== retry %s at step %i: %s ==", name, i, error)
+			self.sampler.parameters.list[name].current_value = value
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+# online.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import os
+
+from numpy import asarray, atleast_1d, concatenate, full, ravel, arange, array_split
+
+from trendpy.factory import SamplerFactory
+from trendpy.mcmc import MCMC
+from trendpy.parallel import parallel_map, spawn_seeds
+from trendpy.storage import SummaryStorage
+from trendpy.rng import RandomGenerator
+
+__all__ = ['OnlineFilter','rolling_filter']
+
+def _filter_windows(arguments):
+	""" Filters consecutive windows with one online filter (executed in a worker process)."""
+	data, ends, step, options = arguments
+	online = OnlineFilter(**options)
+	values = []
+	for (i, end) in enumerate(ends):
+		online.update(data[end-online.window:end] if i == 0 else data[end-step:end])
+		values.append(online.estimate[-1])
+	return values
+
+def rolling_filter(data, window, step=1, method="L1", number_simulations=40, burns=20, total_variation=2, max_restart=5, n_jobs=1, seed=None):
+	""" Filters the trend as it was known at each date, that is on each
+		window of observations ending at that date, and returns the last
+		value of the trend of every window.
+
+	The windows are split in as many blocks of consecutive windows as there
+	are jobs. In a block the windows are filtered by an
+	:py:class:`OnlineFilter`, each one being warm-started from the last
+	state of the previous one, and the blocks run on a pool of worker
+	processes. The draws, hence the values, depend on the number of jobs.
+
+	:param data: 1D time series to be filtered
+	:type data: list, optional (data can also be a numpy array or a pandas.Series)
+	:param window: number of observations in each window.
+	:type window: int
+	:param step: number of observations between the ends of two windows.
+	:type step: int, optional
+	:param method: name of the sampler
+	:type method: str, optional
+	:param number_simulations: number of simulations of the MCMC algorithm for each window
+	:type number_simulations: int, optional
+	:param burns: number of draws dismissed as burning samples for each window
+	:type burns: int, optional
+	:param total_variation: order of the total variation penalty
+	:type total_variation: int, optional
+	:param max_restart: number of times a failed draw is retried.
+	:type max_restart: int, optional
+	:param n_jobs: number of processes filtering the windows (-1 uses all the cores).
+	:type n_jobs: int, optional
+	:param seed: seed of the random number generator.
+	:type seed: int, optional
+	:return: trend at the end of each window (a Series indexed by the last
+		date of the windows if data is one).
+	:rtype: `Numpy.dnarray` or `pandas.Series`
+	"""
+	values = asarray(data,dtype=float).ravel()
+	if window > len(values):
+		raise ValueError("The window is longer than the series")
+	ends = arange(window,len(values)+1,step)
+	jobs = (os.cpu_count() or 1) if n_jobs < 0 else n_jobs
+	blocks = [block for block in array_split(ends,min(jobs,len(ends))) if len(block) > 0]
+	options = {'window' : window, 'method' : method, 'number_simulations' : number_simulations, 'burns' : burns, 'total_variation' : total_variation, 'max_restart' : max_restart}
+	# each worker only receives the observations of its windows
+	tasks = [(values[block[0]-window:block[-1]], block-block[0]+window, step, dict(options,seed=s)) for (block, s) in zip(blocks,spawn_seeds(seed,len(blocks)))]
+	trend = asarray([value for result in parallel_map(_filter_windows,tasks,n_jobs) for value in result])
+	if hasattr(data,'index'):
+		return data.__class__(trend,index=data.index[ends-1])
+	return trend
+
+class OnlineFilter(object):
+	""" Filters the trend of a time series observed sequentially.
+
+	Each update only re-estimates the trend over the last ``window``
+	observations: the Gibbs sampler is warm-started from the last state
+	of the previous window, shifted by the number of new observations,
+	so a few sweeps are enough and the cost of an update is proportional
+	to the window length and not to the length of the history. The
+	trend of observations that left the window is frozen at its last
+	estimate. When an update brings more observations than fit in the
+	window, like a first update with the history, the whole series is
+	filtered once so that those leaving the window straight away are
+	frozen at a filtered value too.
+
+	Examples
+	--------
+
+	>>> online = OnlineFilter(window=200)
+	>>> online.update(history)
+	>>> for tick in ticks:
+	...     trend = online.update(tick)
+	"""
+
+	def __init__(self, window=250, method="L1", number_simulations=40, burns=20, total_variation=2, max_restart=5, seed=None):
+		""" Creates an online filter.
+
+		:param window: number of most recent observations that are re-filtered at each update.
+		:type window: int, optional
+		:param method: name of the sampler
+		:type method: str, optional
+		:param number_simulations: number of simulations of the MCMC algorithm at each update
+		:type number_simulations: int, optional
+		:param burns: number of draws dismissed as burning samples at each update
+		:type burns: int, optional
+		:param total_variation: order of the total variation penalty
+		:type total_variation: int, optional
+		:param max_restart: number of times a failed draw is retried.
+		:type max_restart: int, optional
+		:param seed: seed of the random number generator.
+		:type seed: int, optional
+		"""
+		if window < total_variation+2:
+			raise ValueError("The window must contain at least %i observations" % (total_variation+2))
+		self.window = window
+		self.method = method
+		self.number_simulations = number_simulations
+		self.burns = burns
+		self.total_variation = total_variation
+		self.max_restart = max_restart
+		self.random = RandomGenerator(seed)
+		self.observations = asarray([],dtype=float)
+		self.estimate = asarray([],dtype=float)
+		self.frozen = []
+		self.state = None
+
+	@property
+	def trend(self):
+		""" Trend estimate of the whole history."""
+		return concatenate([asarray(self.frozen),self.estimate])
+
+	def __len__(self):
+		return len(self.frozen)+len(self.observations)
+
+	def update(self, observations):
+		""" Appends new observations and updates the trend over the window.
+
+		:param observations: new observation(s)
+		:type observations: float or iterable
+		:return: trend estimate of the whole history
+		:rtype: `Numpy.dnarray`
+		"""
+		new = ravel(atleast_1d(asarray(observations,dtype=float)))
+		overflow = max(len(self.observations)+len(new)-self.window,0)
+		if overflow > len(self.estimate):
+			# some of the new observations leave the window straight away:
+			# the whole series is filtered once, so that they are frozen at
+			# a filtered value, and the window is then re-filtered from that
+			# state as in any other update
+			self.observations = concatenate([self.observations,new])
+			self.estimate = self.run(self.observations,None)
+			new = new[:0]
+		self.frozen.extend(self.estimate[:overflow])
+		self.observations = concatenate([self.observations,new])[overflow:]
+
+		if len(self.observations) < self.total_variation+2:
+			self.estimate = self.observations.copy()
+			return self.trend
+
+		self.estimate = self.run(self.observations,self.warm_start(new,overflow))
+		return self.trend
+
+	def run(self, observations, initial_values):
+		""" Filters observations and keeps the last state of the chain.
+
+		:param observations: observations to be filtered.
+		:type observations: `Numpy.dnarray`
+		:param initial_values: initial values of the chain (see :py:meth:`warm_start`).
+		:type initial_values: dict
+		:return: trend estimate
+		:rtype: `Numpy.dnarray`
+		"""
+		sampler = SamplerFactory.create(self.method,observations,total_variation_order=self.total_variation)
+		sampler.random = self.random
+		mcmc = MCMC(sampler)
+		mcmc.run(self.number_simulations,self.max_restart,0,initial_values=initial_values,storage=SummaryStorage(self.burns))
+		self.state = {name : param.current_value for (name, param) in sampler.parameters.list.items()}
+		return ravel(mcmc.output(self.burns,"trend"))
+
+	def warm_start(self, new, overflow):
+		""" Shifts the last state of the chain to the current window.
+
+		:param new: observations appended to the window.
+		:type new: `Numpy.dnarray`
+		:param overflow: number of observations that left the window.
+		:type overflow: int
+		:return: initial values of the next run
+		:rtype: dict
+		"""
+		if self.state is None:
+			return None
+		omega = ravel(self.state['omega'])
+		return {'trend' : concatenate([ravel(self.state['trend']),new])[overflow:],
+				'omega' : concatenate([omega,full(len(new),omega[-1])])[overflow:],
+				'sigma2' : self.state['sigma2'],
+				'lambda2' : self.state['lambda2']}
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# parallel.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy import zeros, ones, arange
+from numpy.random import SeedSequence
+
+__all__ = ['parallel_map','spawn_seeds','segment_bounds','stitch_segments']
+
+def parallel_map(function, iterable, n_jobs=1):
+	""" Applies a function to every element of an iterable, on a pool
+		of worker processes when more than one job is requested.
+
+	:param function: picklable function taking one argument.
+	:type function: callable
+	:param iterable: arguments of the function.
+	:type iterable: iterable
+	:param n_jobs: number of worker processes (-1 uses all the cores).
+	:type n_jobs: int
+	:return: results in the order of the arguments.
+	:rtype: list
+	"""
+	if n_jobs == 1:
+		return [function(x) for x in iterable]
+	with ProcessPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs) as executor:
+		return list(executor.map(function, iterable))
+
+def spawn_seeds(seed, number):
+	""" Derives independent seeds for parallel random streams.
+
+	:param seed: root seed (fresh entropy is used if None).
+	:type seed: int, optional
+	:param number: number of seeds to derive.
+	:type number: int
+	:return: list of integer seeds.
+	:rtype: list
+	"""
+	return [int(child.generate_state(1)[0]) for child in SeedSequence(seed).spawn(number)]
+
+def segment_bounds(size, length, overlap):
+	""" Splits a series in segments of the same length overlapping their
+		neighbours, the last one being aligned on the end of the series.
+
+	:param size: length of the series.
+	:type size: int
+	:param length: length of the segments.
+	:type length: int
+	:param overlap: number of observations shared by two consecutive segments
+		(at least, the last segment may overlap more).
+	:type overlap: int
+	:return: list of (start, end) of the segments.
+	:rtype: list
+	"""
+	if not 0 <= overlap < length:
+		raise ValueError("The overlap must be smaller than the length of the segments")
+	if length >= size:
+		return [(0,size)]
+	starts = list(range(0,size-length,length-overlap))+[size-length]
+	return [(start,start+length) for start in starts]
+
+def stitch_segments(pieces, bounds):
+	""" Stitches estimates computed on overlapping segments. In an overlap
+		the estimates are averaged with weights tapering linearly towards
+		the end of each segment, where they are the least reliable.
+
+	:param pieces: estimates on each segment.
+	:type pieces: list
+	:param bounds: (start, end) of the segments, as returned by :py:func:`segment_bounds`.
+	:type bounds: list
+	:return: estimate on the whole series.
+	:rtype: `Numpy.dnarray`
+	"""
+	size = bounds[-1][1]
+	total = zeros(size)
+	weights = zeros(size)
+	for (i, (piece, (start, end))) in enumerate(zip(pieces,bounds)):
+		weight = ones(end-start)
+		if i > 0:
+			shared = bounds[i-1][1]-start
+			weight[:shared] = arange(1,shared+1)/(shared+1.)
+		if i < len(bounds)-1:
+			shared = end-bounds[i+1][0]
+			weight[end-start-shared:] = arange(shared,0,-1)/(shared+1.)
+		total[start:end] += weight*piece.ravel()
+		weights[start:end] += weight
+	return total/weights
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# rng.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+from numpy.random import default_rng
+
+__all__ = ['RandomGenerator']
+
+class RandomGenerator(object):
+	""" Draws the random variates of the samplers directly from a
+		`Numpy.random.Generator`, without the argument checking and
+		frozen distributions of `Scipy.stats` rvs.
+
+	The methods are named after the `Scipy.stats` distributions and follow
+	their (shape, loc, scale) parametrization, so a draw has the same
+	distribution as the corresponding ``rvs`` call.
+
+	Examples
+	--------
+
+	>>> random = RandomGenerator(seed=1)
+	>>> random.invgamma(10,scale=2)
+	>>> random.rvs(invgamma,10,scale=2)
+	"""
+
+	def __init__(self, seed=None):
+		""" Creates a random generator.
+
+		:param seed: seed of the generator (fresh entropy is used if None).
+		:type seed: int, optional
+		"""
+		self.generator = default_rng(seed)
+
+	def norm(self, loc=0, scale=1, size=None):
+		""" Gaussian variates."""
+		return loc+scale*self.generator.standard_normal(size)
+
+	def gamma(self, a, loc=0, scale=1, size=None):
+		""" Gamma variates with shape a."""
+		return loc+scale*self.generator.standard_gamma(a,size)
+
+	def invgamma(self, a, loc=0, scale=1, size=None):
+		""" Inverse gamma variates with shape a."""
+		return loc+scale/self.generator.standard_gamma(a,size)
+
+	def invgauss(self, mu, loc=0, scale=1, size=None):
+		""" Inverse Gaussian variates with mean mu*scale and shape scale."""
+		return loc+self.generator.wald(mu*scale,scale,size)
+
+	def rvs(self, distribution, *args, **kwargs):
+		""" Draws from a `Scipy.stats` distribution, directly when it is one of
+			the distributions above and with its rvs method otherwise.
+
+		:param distribution: distribution to draw from.
+		:type distribution: `Scipy.stats.rv_continuous`
+		:return: random variates
+		"""
+		name = getattr(distribution,'name',None)
+		if name in ('norm','gamma','invgamma','invgauss'):
+			return getattr(self,name)(*args,**kwargs)
+		return distribution.rvs(*args,random_state=self.generator,**kwargs)
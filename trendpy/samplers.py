@@ -26,14 +26,46 @@
 
 from __future__ import absolute_import
 
-from numpy import eye, zeros, dot, array, diag, sqrt, mean
+from numpy import array, sqrt, exp, log, mean, pi, asarray, reciprocal, empty_like, tile, full, atleast_2d, maximum, finfo, clip, errstate, float64
 
 from scipy.stats import multivariate_normal, invgamma, invgauss, gamma
-from numpy.linalg import inv, norm
+from scipy.special import comb, erf
+from scipy.linalg import cholesky_banded, cho_solve_banded, solve_banded, LinAlgError
 
-from trendpy.globals import derivative_matrix
+from itertools import count
 
-__all__ = ['Parameter','Parameters','Sampler','L1']
+from trendpy.globals import cached_derivative_matrix, difference_coefficients, banded_gram, banded_inverse
+from trendpy.rng import RandomGenerator
+
+__all__ = ['Parameter','Parameters','Sampler','L1','BatchL1']
+
+_stamps = count()
+
+def _jittered_cholesky(ab, attempts=5):
+	""" Banded Cholesky factorization of a symmetric positive definite
+		matrix which, when rounding errors make the matrix numerically
+		indefinite, adds to its diagonal a jitter growing from 1e-12 times
+		its largest diagonal element.
+
+	:param ab: upper banded storage of the matrix.
+	:type ab: `Numpy.dnarray`
+	:param attempts: number of jittered factorizations tried.
+	:type attempts: int, optional
+	:return: upper Cholesky factor in banded storage
+	:rtype: `Numpy.dnarray`
+	"""
+	try:
+		return cholesky_banded(ab)
+	except LinAlgError:
+		jitter = 1e-12*ab[-1].max()
+		for attempt in range(attempts):
+			shifted = ab.copy()
+			shifted[-1] += jitter
+			try:
+				return cholesky_banded(shifted)
+			except LinAlgError:
+				jitter *= 100
+		raise
 
 class Parameter(object):
 	""" Implements an unknown parameter to be estimated
@@ -76,6 +108,12 @@ class Parameter(object):
 	@current_value.setter
 	def current_value(self, current_value):
 		self.__current_value = current_value
+		self.__stamp = next(_stamps)
+
+	@property
+	def stamp(self):
+		"""Unique identifier of the current value, renewed at each assignment"""
+		return self.__stamp
 
 	def __str__(self):
 		return """
@@ -208,6 +246,28 @@ class Sampler(object):
 		self.options = None
 		self.derivative_matrix = None
 		self.parameters = None
+		self.cache = {}
+		self.random = RandomGenerator()
+
+	def cached(self, key, dependencies, function):
+		""" Returns a quantity derived from the current parameter values,
+			computing it only if one of the parameters it depends on has
+			been updated since the last call.
+
+		:param key: name of the derived quantity.
+		:type key: str
+		:param dependencies: names of the parameters the quantity depends on.
+		:type dependencies: tuple
+		:param function: function computing the quantity.
+		:type function: callable
+		:return: the (possibly cached) quantity
+		"""
+		stamps = tuple(self.parameters.list[name].stamp for name in dependencies)
+		if key in self.cache and self.cache[key][0] == stamps:
+			return self.cache[key][1]
+		value = function()
+		self.cache[key] = (stamps, value)
+		return value
 
 	def define_parameters(self):
 		""" Method to set the parameter set to be updated
@@ -239,17 +299,54 @@ class Sampler(object):
         """
 		raise NotImplementedError("Must be overriden")
 
-	def generate(self,parameter_name):
+	def generate(self,parameter_name,parameters=None):
 		""" This method handles the generation of the random draws of
 			the Markov chain for each parameters.
 
 		:param parameter_name: name of the parameter of interest
 		:type parameter_name: string
+		:param parameters: parameters of the posterior distribution, as returned
+			by :py:meth:`distribution_parameters` (computed if None)
+		:type parameters: dict, optional
 		:return: random draw from the posterior probability distribution
 		:rtype: `Numpy.dnarray`
         """
 		raise NotImplementedError("Must be overriden")
 
+	def sweep(self):
+		""" Method that draws every parameter at once, for samplers with a
+			compiled Gibbs sweep.
+
+		:return: new value of every parameter, or None to draw them one by
+			one with :py:meth:`generate`
+		:rtype: dict
+		"""
+		return None
+
+	def initial_moments(self, parameter_name):
+		""" Method that sets the initial moments of the approximate
+			posterior distribution of a parameter for variational inference.
+
+		:param parameter_name: name of the parameter.
+		:type parameter_name: str
+		:return: dictionary of moments (at least 'mean' and 'variance')
+		:rtype: dict
+		"""
+		raise NotImplementedError("Must be overriden")
+
+	def variational_update(self, parameter_name, moments):
+		""" Method that computes the moments of the mean-field approximate
+			posterior of a parameter given the moments of the others.
+
+		:param parameter_name: name of the parameter.
+		:type parameter_name: str
+		:param moments: current moments of every parameter, keyed by name.
+		:type moments: dict
+		:return: dictionary of moments (at least 'mean' and 'variance')
+		:rtype: dict
+		"""
+		raise NotImplementedError("Must be overriden")
+
 	def output(self, simulations, burn, parameter_name):
 		""" Computes the poserior mean of the parameters.
 
@@ -270,13 +367,28 @@ class Sampler(object):
 
 class L1(Sampler):
 
-	def __init__(self,data,alpha=0.1,rho=0.1,total_variation_order=2):
+	#: range of the draws of omega
+	omega_bounds = (1e-10,1e10)
+
+	def __init__(self,data,alpha=0.1,rho=0.1,total_variation_order=2,seed=None,dtype=None,backend='numpy'):
 		self.rho = rho
 		self.alpha = alpha
-		self.__data = data
-		self.size = len(data)
+		# data and draws are kept in dtype, factorizations and solves in float64
+		self.dtype = float64 if dtype is None else dtype
+		if backend not in ('numpy','numba'):
+			raise ValueError("Unknown backend %s" % backend)
+		if backend == 'numba':
+			# numba takes a while to import: only loaded when asked for
+			from trendpy.jit import NUMBA_AVAILABLE
+			if not NUMBA_AVAILABLE:
+				raise ValueError("The numba backend needs numba to be installed")
+		self.backend = backend
+		self.__data = asarray(data, dtype=self.dtype).ravel()
+		self.size = len(self.__data)
 		self.total_variation_order = total_variation_order
-		self.derivative_matrix = derivative_matrix(self.size, self.total_variation_order)
+		self.derivative_matrix = cached_derivative_matrix(self.size, self.total_variation_order)
+		self.cache = {}
+		self.random = RandomGenerator(seed)
 		self.define_parameters()
 
 
@@ -313,41 +425,258 @@ class L1(Sampler):
 		elif parameter_name==str('omega'):
 			return 0.8*array([(30*(i/2)+3)/(2*(i/2)+35) for i in range(self.size-self.total_variation_order)])
 
+	def weights(self):
+		""" Inverse of the current mixing variables, 1/omega."""
+		return self.cached('weights',('omega',),lambda: 1/self.parameters.list['omega'].current_value)
+
+	def differences(self):
+		""" Differences of the current trend, D.trend."""
+		return self.cached('differences',('trend',),lambda: self.derivative_matrix.dot(self.parameters.list['trend'].current_value))
+
+	def precision_cholesky(self):
+		""" Computes the banded Cholesky factor of the trend posterior
+			precision I+D'diag(1/omega)D (up to the factor 1/sigma2).
+
+		:return: upper Cholesky factor in banded storage
+		:rtype: `Numpy.dnarray`
+		"""
+		def factorize():
+			ab = banded_gram(self.size, self.total_variation_order, self.weights())
+			ab[-1] += 1
+			return _jittered_cholesky(ab)
+		return self.cached('cholesky',('omega',),factorize)
+
 	def distribution_parameters(self, parameter_name):
 		if parameter_name=='trend':
-			E = dot(dot(self.derivative_matrix.T,inv(diag(self.parameters.list['omega'].current_value))),self.derivative_matrix)
-			mean = dot(inv(eye(self.size)+E),self.data)
-			cov = (self.parameters.list['sigma2'].current_value)*inv(eye(self.size)+E)
-			return {'mean' : mean, 'cov' : cov}
+			cholesky = self.precision_cholesky()
+			mean = cho_solve_banded((cholesky,False),self.data)
+			return {'mean' : mean, 'cholesky' : cholesky, 'scale' : self.parameters.list['sigma2'].current_value}
 		elif parameter_name=='sigma2':
-			E = dot(dot(self.derivative_matrix.T,inv(diag(self.parameters.list['omega'].current_value))),self.derivative_matrix)
+			residuals = self.data-self.parameters.list['trend'].current_value
+			differences = self.differences()
 			pos = self.size
 			loc = 0
-			scale = 0.5*dot((self.data-dot(eye(self.size),self.parameters.list['trend'].current_value)).T,(self.data-dot(eye(self.size),self.parameters.list['trend'].current_value)))+0.5*dot(dot(self.parameters.list['trend'].current_value.T,E),self.parameters.list['trend'].current_value)
+			scale = 0.5*(residuals*residuals).sum(axis=0)+0.5*(differences*differences*self.weights()).sum(axis=0)
 		elif parameter_name=='lambda2':
 			pos = self.size-self.total_variation_order-1+self.alpha
-			loc = 0.5*(norm(dot(self.derivative_matrix,self.parameters.list['trend'].current_value),ord=1))/self.parameters.list['sigma2'].current_value+self.rho
+			loc = 0.5*(abs(self.differences()).sum(axis=0))/self.parameters.list['sigma2'].current_value+self.rho
 			scale = 1
 		elif parameter_name==str('omega'):
-			pos = [sqrt(((self.parameters.list['lambda2'].current_value**2)*self.parameters.list['sigma2'].current_value)/(dj**2)) for dj in dot(self.derivative_matrix,self.parameters.list['trend'].current_value)]
+			# in log space, so that a zero difference gives a large but finite mean
+			differences = self.differences()
+			pos = exp(log(self.parameters.list['lambda2'].current_value)+0.5*log(self.parameters.list['sigma2'].current_value)-0.5*log(maximum(differences*differences,finfo(float).tiny)))
 			loc = 0
 			scale = self.parameters.list['lambda2'].current_value**2
 		return {'pos' : pos, 'loc' : loc, 'scale' : scale}
 
-	def generate(self,parameter_name):
+	def cast(self, value):
+		""" Converts a draw to the dtype of the sampler, the scalar
+			parameters becoming numpy scalars.
+
+		:param value: the draw.
+		:type value: float or `Numpy.dnarray`
+		:return: the draw in the dtype of the sampler
+		"""
+		return asarray(value).astype(self.dtype,copy=False)[()]
+
+	def generate(self,parameter_name,parameters=None):
 		distribution = self.parameters.list[parameter_name].distribution
-		parameters = self.distribution_parameters(parameter_name)
+		if parameters is None:
+			parameters = self.distribution_parameters(parameter_name)
 
 		if parameter_name=='trend':
-			return distribution.rvs(parameters['mean'],parameters['cov'])
+			# if U'U is the precision, U^{-1}z has covariance (U'U)^{-1}
+			noise = solve_banded((0,self.total_variation_order),parameters['cholesky'],self.random.norm(size=self.size))
+			return self.cast(parameters['mean']+sqrt(parameters['scale'])*noise)
+		elif parameter_name=='omega':
+			draws = self.random.rvs(distribution,parameters['pos'],loc=parameters['loc'],scale=parameters['scale'],size=parameters['pos'].shape)
+			with errstate(divide='ignore'):
+				reciprocal(draws,out=draws)
+			# 1/omega weights the differences in the trend precision: beyond
+			# the bounds the factorization of the precision breaks down
+			clip(draws,self.omega_bounds[0],self.omega_bounds[1],out=draws)
+			return self.cast(draws.reshape(self.parameters.list['omega'].current_value.shape))
+		return self.cast(self.random.rvs(distribution,parameters['pos'],loc=parameters['loc'],scale=parameters['scale'])) #pb with the parameter name
+
+	def sweep(self):
+		# the kernel hard-codes the L1 conditionals: subclasses overriding them
+		# draw their parameters one by one
+		if getattr(self,'backend','numpy') != 'numba' or type(self).generate is not L1.generate or type(self).distribution_parameters is not L1.distribution_parameters:
+			return None
+		from trendpy.jit import l1_sweep
+		params = self.parameters.list
+		(positive, trend, sigma2, lambda2, omega) = l1_sweep(int(self.random.generator.integers(2**31)),
+			asarray(self.data,dtype=float64),asarray(params['sigma2'].current_value,dtype=float64).item(),
+			asarray(params['lambda2'].current_value,dtype=float64).item(),asarray(params['omega'].current_value,dtype=float64).ravel(),
+			difference_coefficients(self.total_variation_order),float(self.alpha),float(self.rho),self.omega_bounds[0],self.omega_bounds[1])
+		if not positive:
+			return None
+		# converted as in generate: the kernel computes in float64
+		return {'trend' : self.cast(trend), 'sigma2' : self.cast(sigma2), 'lambda2' : self.cast(lambda2),
+				'omega' : self.cast(omega.reshape(params['omega'].current_value.shape))}
+
+	def initial_moments(self, parameter_name):
+		# starting from a heavily smoothed trend (a smoothing window of about
+		# 30 points) converges in far fewer iterations than from a rough one
+		if parameter_name=='sigma2':
+			differences = self.derivative_matrix.dot(self.data)
+			value = mean(differences*differences)/comb(2*self.total_variation_order,self.total_variation_order)
 		elif parameter_name=='omega':
-			return array([1/distribution.rvs(parameters['pos'][i],loc=parameters['loc'],scale=parameters['scale']) for i in range(len(self.parameters.list['omega'].current_value))]).reshape(self.parameters.list['omega'].current_value.shape)
-		return distribution.rvs(parameters['pos'],loc=parameters['loc'],scale=parameters['scale']) #pb with the parameter name
+			value = full(self.size-self.total_variation_order,min(0.1*self.size,30.)**(-2*self.total_variation_order))
+		else:
+			value = asarray(self.initial_value(parameter_name), dtype=float)
+		moments = {'mean' : value, 'variance' : 0*value}
+		if parameter_name in ('sigma2','omega'):
+			moments['inverse'] = 1/value
+		if parameter_name=='omega':
+			moments['weight'] = 1/value
+		return moments
+
+	def variational_update(self, parameter_name, moments):
+		# each factor is the expectation of the log of the Gibbs conditional
+		# of distribution_parameters under the other factors, so that the
+		# engine approximates the posterior the sampler draws from
+		order = self.total_variation_order
+		count = self.size-order
+		if parameter_name=='trend':
+			ab = banded_gram(self.size, order, moments['omega']['weight'])
+			ab[-1] += 1
+			cholesky = _jittered_cholesky(ab)
+			mean = cho_solve_banded((cholesky,False),self.data)
+			band = banded_inverse(cholesky)/moments['sigma2']['inverse']
+			# diagonal of D.Cov.D' from the band of the covariance
+			coefficients = difference_coefficients(order)
+			spread = 0.
+			for a in range(order+1):
+				for b in range(a,order+1):
+					spread = spread+(1 if a == b else 2)*coefficients[a]*coefficients[b]*band[order-(b-a),b:b+count]
+			spread = maximum(spread,0.)
+			differences = self.derivative_matrix.dot(mean)
+			# mean of |D.trend|, a folded gaussian
+			deviation = sqrt(spread)
+			with errstate(divide='ignore',invalid='ignore'):
+				folded = deviation*sqrt(2/pi)*exp(-0.5*differences*differences/(deviation*deviation))+differences*erf(differences/(sqrt(2)*deviation))
+			folded[deviation == 0] = abs(differences[deviation == 0])
+			return {'mean' : mean, 'variance' : band[order], 'squared_differences' : differences*differences+spread,
+					'absolute_differences' : folded}
+		elif parameter_name=='sigma2':
+			# inverse gamma with shape size, as drawn by the sampler
+			trend = moments['trend']
+			residuals = self.data-trend['mean']
+			shape = self.size
+			scale = 0.5*((residuals*residuals).sum()+trend['variance'].sum())+0.5*(trend['squared_differences']*moments['omega']['weight']).sum()
+			return {'mean' : scale/(shape-1), 'variance' : scale**2/((shape-1)**2*(shape-2)), 'inverse' : shape/scale}
+		elif parameter_name=='lambda2':
+			# gamma shifted by the penalty of the differences, the shift being
+			# replaced by its expectation
+			shape = count-1+self.alpha
+			loc = self.rho+0.5*moments['sigma2']['inverse']*moments['trend']['absolute_differences'].sum()
+			mean = loc+shape
+			# second order expansion of E[lambda2^-4] (shape/mean^2 is about 1/size)
+			return {'mean' : mean, 'variance' : asarray(shape,dtype=float), 'square' : mean*mean+shape,
+					'inverse_fourth' : (1+10*shape/(mean*mean))/mean**4}
+		elif parameter_name==str('omega'):
+			# the conditional of 1/omega is an inverse gaussian whose log
+			# density is, up to a constant, -d^2/(2 sigma2 lambda2^4) w - lambda2^2/(2w)
+			shape = moments['lambda2']['square']
+			rate = moments['trend']['squared_differences']*moments['sigma2']['inverse']*moments['lambda2']['inverse_fourth']
+			mu = sqrt(shape/maximum(rate,finfo(float).tiny))
+			clip(mu,1/self.omega_bounds[1],1/self.omega_bounds[0],out=mu)
+			mean = 1/mu+1/shape
+			# the mean mu of 1/omega is usually far above its shape, where the
+			# inverse gaussian has a Levy-like tail the sampler seldom visits:
+			# weighting the differences by it, as plain mean-field would, makes
+			# the trend collapse onto a polynomial. The differences are weighted
+			# by 1/E[omega] instead, which reproduces the trend drawn by L1
+			return {'mean' : mean, 'variance' : 1/(mu*shape)+2/shape**2, 'inverse' : mu, 'weight' : 1/mean}
 
 	def output(self, simulations, burn, parameter_name):
-		out = mean(simulations[parameter_name][:,:,burn:],axis=2)
+		draws = simulations[parameter_name][:,:,burn:]
+		out = mean(draws,axis=tuple(range(2,draws.ndim)))
 		return out
 
 	class Factory(object):
 		def create(self,*args,**kwargs):
-			return L1(args[0],total_variation_order=kwargs['total_variation_order'])
+			return L1(args[0],total_variation_order=kwargs['total_variation_order'],seed=kwargs.get('seed'),dtype=kwargs.get('dtype'),backend=kwargs.get('backend','numpy'))
+
+class BatchL1(L1):
+	""" L1 sampler filtering several series of the same length at once.
+
+	The series are the columns of the data. Every parameter gets one
+	column per series and the Gibbs updates are vectorized across
+	columns, the difference operator being shared by all the series.
+	"""
+
+	def __init__(self,data,alpha=0.1,rho=0.1,total_variation_order=2,seed=None,dtype=None):
+		self.rho = rho
+		self.alpha = alpha
+		self.dtype = float64 if dtype is None else dtype
+		self.backend = 'numpy'
+		self.__data = atleast_2d(asarray(data, dtype=self.dtype).T).T
+		self.size, self.batch_size = self.__data.shape
+		self.total_variation_order = total_variation_order
+		self.derivative_matrix = cached_derivative_matrix(self.size, self.total_variation_order)
+		self.cache = {}
+		self.random = RandomGenerator(seed)
+		self.define_parameters()
+
+	@property
+	def data(self):
+		return self.__data
+
+	def define_parameters(self):
+		params=Parameters()
+
+		params.append(Parameter("trend", multivariate_normal, (self.size,self.batch_size)))
+		params.append(Parameter("sigma2", invgamma, (1,self.batch_size)))
+		params.append(Parameter("lambda2", gamma, (1,self.batch_size)))
+		params.append(Parameter("omega", invgauss, (self.size-self.total_variation_order,self.batch_size)))
+
+		self.parameters = params
+
+	def initial_value(self,parameter_name):
+		value = L1.initial_value(self,parameter_name)
+		if parameter_name in ('trend','omega'):
+			return tile(value[:,None],(1,self.batch_size))
+		return full(self.batch_size,value,dtype=float)
+
+	def precision_cholesky(self):
+		""" Computes the banded Cholesky factors of the trend posterior
+			precisions of all the series.
+
+		:return: upper Cholesky factors in banded storage, stacked on the last axis
+		:rtype: `Numpy.dnarray`
+		"""
+		def factorize():
+			ab = banded_gram(self.size, self.total_variation_order, self.weights())
+			ab[-1] += 1
+			for j in range(self.batch_size):
+				ab[:,:,j] = _jittered_cholesky(ab[:,:,j])
+			return ab
+		return self.cached('cholesky',('omega',),factorize)
+
+	def variational_update(self, parameter_name, moments):
+		raise NotImplementedError("Variational inference is only implemented for a single series")
+
+	def distribution_parameters(self, parameter_name):
+		if parameter_name=='trend':
+			cholesky = self.precision_cholesky()
+			mean = empty_like(self.data)
+			for j in range(self.batch_size):
+				mean[:,j] = cho_solve_banded((cholesky[:,:,j],False),self.data[:,j])
+			return {'mean' : mean, 'cholesky' : cholesky, 'scale' : self.parameters.list['sigma2'].current_value}
+		return L1.distribution_parameters(self,parameter_name)
+
+	def generate(self,parameter_name,parameters=None):
+		if parameter_name=='trend':
+			if parameters is None:
+				parameters = self.distribution_parameters(parameter_name)
+			noise = self.random.norm(size=(self.size,self.batch_size))
+			for j in range(self.batch_size):
+				noise[:,j] = solve_banded((0,self.total_variation_order),parameters['cholesky'][:,:,j],noise[:,j])
+			return self.cast(parameters['mean']+sqrt(parameters['scale'])*noise)
+		return L1.generate(self,parameter_name,parameters)
+
+	class Factory(object):
+		def create(self,*args,**kwargs):
+			return BatchL1(args[0],total_variation_order=kwargs['total_variation_order'],seed=kwargs.get('seed'),dtype=kwargs.get('dtype'))
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+# storage.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import os
+import tempfile
+
+from numpy import zeros, concatenate, stack, float64
+from numpy.lib.format import open_memmap
+
+__all__ = ['MemoryStorage','DiskStorage','SummaryStorage','Summary']
+
+class MemoryStorage(object):
+	""" Keeps the draws of the Markov chain in memory."""
+
+	def allocate(self, name, shape, dtype=float64):
+		""" Creates the trace of a parameter.
+
+		:param name: name of the parameter.
+		:type name: str
+		:param shape: shape of the trace (rows, columns, number of draws).
+		:type shape: tuple
+		:param dtype: type of the draws in the trace (e.g. float32 halves
+			its memory).
+		:type dtype: `Numpy.dtype`, optional
+		:return: the trace
+		:rtype: `Numpy.dnarray`
+		"""
+		return zeros(shape,dtype=dtype)
+
+	def resize(self, name, trace, number_simulations):
+		""" Extends the trace of a parameter to a larger number of draws.
+
+		:param name: name of the parameter.
+		:type name: str
+		:param trace: current trace.
+		:type trace: `Numpy.dnarray`
+		:param number_simulations: new number of draws.
+		:type number_simulations: int
+		:return: the extended trace
+		:rtype: `Numpy.dnarray`
+		"""
+		if trace.shape[2] >= number_simulations:
+			return trace
+		return concatenate([trace,zeros(trace.shape[:2]+(number_simulations-trace.shape[2],),dtype=trace.dtype)],axis=2)
+
+	def write(self, name, trace, index, value):
+		""" Records a draw in the trace of a parameter.
+
+		:param name: name of the parameter.
+		:type name: str
+		:param trace: trace of the parameter.
+		:type trace: `Numpy.dnarray`
+		:param index: index of the draw.
+		:type index: int
+		:param value: the draw.
+		:type value: `Numpy.dnarray`
+		"""
+		trace[:,:,index] = value
+
+	def flush(self):
+		""" Writes the pending draws to the traces."""
+		pass
+
+	def memory(self, simulations):
+		""" Number of bytes of memory used by the traces.
+
+		:param simulations: traces of the parameters.
+		:type simulations: dict
+		:return: memory used
+		:rtype: int
+		"""
+		return sum(trace.nbytes for trace in simulations.values())
+
+	def merge(self, traces):
+		""" Merges the traces of independent chains along a chains axis.
+
+		:param traces: traces of a parameter, one per chain.
+		:type traces: list
+		:return: merged trace
+		"""
+		return stack(traces,axis=3)
+
+	def dump(self, simulations):
+		""" Picklable representation of the traces (for checkpoints)."""
+		return simulations
+
+	def restore(self, representation):
+		""" Traces from their representation returned by :py:meth:`dump`."""
+		return representation
+
+class DiskStorage(MemoryStorage):
+	""" Stores the draws of the Markov chain in .npy files that are
+		memory-mapped, so the size of a run is bounded by the disk and
+		not by the memory. Draws are buffered and written to the files
+		chunk_size at a time.
+
+	Examples
+	--------
+
+	>>> mcmc.run(5000,5,0,storage=DiskStorage('traces'))
+	>>> trend = mcmc.output(1000,'trend')
+	"""
+
+	def __init__(self, directory=None, chunk_size=100):
+		""" Creates a disk storage.
+
+		:param directory: directory of the trace files (a temporary directory if None).
+		:type directory: str, optional
+		:param chunk_size: number of draws buffered in memory before being written.
+		:type chunk_size: int, optional
+		"""
+		self.directory = directory if directory is not None else tempfile.mkdtemp(prefix='trendpy')
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		self.chunk_size = chunk_size
+		self.buffers = {}
+
+	def path(self, name):
+		""" Path of the trace file of a parameter."""
+		return os.path.join(self.directory,'%s.npy' % name)
+
+	def allocate(self, name, shape, dtype=float64):
+		return open_memmap(self.path(name),mode='w+',dtype=dtype,shape=shape)
+
+	def resize(self, name, trace, number_simulations):
+		self.flush()
+		previous = trace.shape[2]
+		if previous >= number_simulations:
+			return trace
+		os.replace(self.path(name),self.path(name)+'.old')
+		old = open_memmap(self.path(name)+'.old',mode='r')
+		new = self.allocate(name,trace.shape[:2]+(number_simulations,),trace.dtype)
+		for start in range(0,previous,self.chunk_size):
+			stop = min(start+self.chunk_size,previous)
+			new[:,:,start:stop] = old[:,:,start:stop]
+		del old
+		os.remove(self.path(name)+'.old')
+		return new
+
+	def write(self, name, trace, index, value):
+		entry = self.buffers.get(name)
+		if entry is not None and not 0 <= index-entry[1] < self.chunk_size:
+			self.flush_trace(name)
+			entry = None
+		if entry is None:
+			entry = self.buffers[name] = [trace, index, zeros(trace.shape[:2]+(self.chunk_size,),dtype=trace.dtype), 0]
+		position = index-entry[1]
+		entry[2][:,:,position] = value
+		entry[3] = max(entry[3],position+1)
+
+	def flush_trace(self, name):
+		""" Writes the buffered draws of a parameter to its file."""
+		trace, start, buffer, count = self.buffers.pop(name)
+		trace[:,:,start:start+count] = buffer[:,:,:count]
+		trace.flush()
+
+	def flush(self):
+		for name in list(self.buffers):
+			self.flush_trace(name)
+
+	def memory(self, simulations):
+		return sum(entry[2].nbytes for entry in self.buffers.values())
+
+	def merge(self, traces):
+		raise ValueError("Several chains can not be stored on disk")
+
+	def dump(self, simulations):
+		self.flush()
+		# the traces of a run stopped early are shorter than their files
+		return {name : (self.path(name),trace.shape[2]) for (name, trace) in simulations.items()}
+
+	def restore(self, representation):
+		return {name : open_memmap(path,mode='r+')[:,:,:length] for (name, (path, length)) in representation.items()}
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['buffers'] = {}
+		return state
+
+class Summary(object):
+	""" Running mean and variance of the draws of a parameter (Welford's
+		algorithm), the first burn draws being dismissed.
+	"""
+
+	def __init__(self, shape, burn):
+		self.burn = burn
+		self.count = 0
+		self.mean = zeros(shape)
+		self.squares = zeros(shape)
+
+	@property
+	def variance(self):
+		""" Posterior variance of the parameter."""
+		return self.squares/max(self.count-1,1)
+
+	def update(self, value):
+		""" Accounts for a new draw.
+
+		:param value: the draw.
+		:type value: `Numpy.dnarray`
+		"""
+		self.count += 1
+		delta = value-self.mean
+		self.mean += delta/self.count
+		self.squares += delta*(value-self.mean)
+
+	def posterior_mean(self, burn):
+		""" Posterior mean of the parameter.
+
+		:param burn: number of draws dismissed as burning samples, must be
+			the one the summary was computed with.
+		:type burn: int
+		:return: posterior mean
+		:rtype: `Numpy.dnarray`
+		:raises ValueError: if no draw was kept after the burning samples.
+		"""
+		if burn != self.burn:
+			raise ValueError("The draws were summarized with %i burning samples, not %i" % (self.burn,burn))
+		if self.count == 0:
+			raise ValueError("No draw was kept after the %i burning samples" % self.burn)
+		return self.mean
+
+	@staticmethod
+	def combine(summaries):
+		""" Pools the summaries of independent chains.
+
+		:param summaries: summaries of the same parameter.
+		:type summaries: list
+		:return: pooled summary
+		:rtype: `trendpy.storage.Summary`
+		"""
+		pooled = Summary(summaries[0].mean.shape,summaries[0].burn)
+		for summary in summaries:
+			count = pooled.count+summary.count
+			if count == 0:
+				continue
+			delta = summary.mean-pooled.mean
+			pooled.squares += summary.squares+delta*delta*pooled.count*summary.count/count
+			pooled.mean += delta*summary.count/count
+			pooled.count = count
+		return pooled
+
+class SummaryStorage(MemoryStorage):
+	""" Keeps only the running mean and variance of the draws after the
+		burning samples instead of the whole trace, so the memory used does
+		not depend on the number of simulations.
+
+		The traces of the simulations are replaced by
+		:py:class:`trendpy.storage.Summary` instances.
+	"""
+
+	def __init__(self, burn):
+		""" Creates a summary storage.
+
+		:param burn: number of draws dismissed as burning samples.
+		:type burn: int
+		"""
+		self.burn = burn
+
+	def allocate(self, name, shape, dtype=float64):
+		# the running moments are small and accumulated in double precision
+		return Summary(shape[:2],self.burn)
+
+	def resize(self, name, trace, number_simulations):
+		return trace
+
+	def write(self, name, trace, index, value):
+		if index >= trace.burn:
+			trace.update(value)
+
+	def memory(self, simulations):
+		return sum(trace.mean.nbytes+trace.squares.nbytes for trace in simulations.values())
+
+	def merge(self, traces):
+		return Summary.combine(traces)
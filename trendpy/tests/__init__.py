@@ -26,3 +26,12 @@
 
 
 from __future__ import absolute_import, print_function, division
+
+from numpy import sin, linspace
+from numpy.random import RandomState
+
+def noisy_sine(size=60, seed=0):
+	""" Sine wave over [0,6] plus gaussian noise with standard deviation
+		0.1, the series most tests filter.
+	"""
+	return sin(linspace(0,6,size))+0.1*RandomState(seed).standard_normal(size)
@@ -36,11 +36,39 @@ sys.path.insert(0,parent_dir)
 import trendpy.tests.tests_factory
 import trendpy.tests.tests_globals
 import trendpy.tests.tests_mcmc
+import trendpy.tests.tests_samplers
+import trendpy.tests.tests_diagnostics
+import trendpy.tests.tests_online
+import trendpy.tests.tests_storage
+import trendpy.tests.tests_rng
+import trendpy.tests.tests_solvers
+import trendpy.tests.tests_variational
+import trendpy.tests.tests_parallel
+import trendpy.tests.tests_startup
+import trendpy.tests.tests_jit
 
 suite = unittest.TestSuite()
 
 suite.addTest(unittest.makeSuite(trendpy.tests.tests_factory.TestFactory))
 suite.addTest(unittest.makeSuite(trendpy.tests.tests_globals.TestGlobals))
 suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestMCMC))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestMultipleChains))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestIterSamples))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestCheckpoint))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestRunStats))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_mcmc.TestRetry))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_samplers.TestL1))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_samplers.TestBatchL1))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_diagnostics.TestDiagnostics))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_online.TestOnlineFilter))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_online.TestRollingFilter))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_storage.TestDiskStorage))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_storage.TestSummaryStorage))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_rng.TestRandomGenerator))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_solvers.TestL1PDIP))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_variational.TestVariationalBayes))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_parallel.TestSegments))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_startup.TestStartup))
+suite.addTest(unittest.makeSuite(trendpy.tests.tests_jit.TestJit))
 
 unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# tests_diagnostics.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+import os
+import sys
+import inspect
+import unittest
+
+from numpy import allclose, sin, linspace
+from numpy.random import RandomState
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+import trendpy.diagnostics
+import trendpy.mcmc
+import trendpy.samplers
+
+class TestDiagnostics(unittest.TestCase):
+
+	def setUp(self):
+		self.random_state = RandomState(0)
+
+	def tearDown(self):
+		self.random_state = None
+
+	def test_rhat_of_mixed_chains(self):
+		trace = self.random_state.standard_normal((3,1,1000,4))
+		self.assertTrue(allclose(trendpy.diagnostics.split_rhat(trace),1,atol=0.02))
+
+	def test_rhat_of_separated_chains(self):
+		trace = self.random_state.standard_normal((1,1,1000,4))
+		trace[...,0] += 5
+		self.assertTrue((trendpy.diagnostics.split_rhat(trace)>1.5).all())
+
+	def test_effective_sample_size(self):
+		independent = self.random_state.standard_normal((2,1,2000))
+		self.assertTrue((trendpy.diagnostics.effective_sample_size(independent)>1500).all())
+		correlated = independent.cumsum(axis=-1)
+		self.assertTrue((trendpy.diagnostics.effective_sample_size(correlated)<100).all())
+
+	def test_geweke(self):
+		trace = self.random_state.standard_normal((5,1,2000))
+		self.assertTrue((abs(trendpy.diagnostics.geweke(trace))<4).all())
+		trace[...,:200] += 3
+		self.assertTrue((abs(trendpy.diagnostics.geweke(trace))>4).all())
+
+	def test_stopping_rule_stops_run(self):
+		data = sin(linspace(0,6,60))+0.1*self.random_state.standard_normal(60)
+		mcmc = trendpy.mcmc.MCMC(trendpy.samplers.L1(data))
+		rule = trendpy.diagnostics.StoppingRule('mcse',0.5,parameter='sigma2',burn=10,check_every=25)
+		mcmc.run(500,5,0,seed=1,stopping_rule=rule)
+		self.assertTrue(mcmc.converged)
+		self.assertEqual(mcmc.iteration,50)
+		self.assertEqual(mcmc.simulations['trend'].shape,(60,1,50))
+
+if __name__ == "__main__":
+	unittest.main()
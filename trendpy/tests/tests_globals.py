@@ -31,7 +31,10 @@ import unittest
 
 from numpy.random import randint
 
-from numpy import inf
+from numpy import inf, allclose, diag, eye
+from numpy.linalg import inv
+
+from scipy.linalg import cholesky_banded
 
 current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
@@ -42,8 +45,8 @@ import trendpy.globals
 class TestGlobals(unittest.TestCase):
 
 	def setUp(self):
-		self.order = int(randint(low=0,high=4,size=1))
-		self.dim = int(randint(low=self.order+2,high=2000,size=1))
+		self.order = int(randint(low=0,high=4))
+		self.dim = int(randint(low=self.order+2,high=2000))
 		self.D = trendpy.globals.derivative_matrix(self.dim,self.order)
 
 	def tearDown(self):
@@ -53,6 +56,47 @@ class TestGlobals(unittest.TestCase):
 		
 	def test_derivative_matrix_size(self):
 		self.assertEqual(self.D.shape,(self.dim-self.order,self.dim))
+
+	def test_sparse_derivative_matrix(self):
+		S = trendpy.globals.derivative_matrix(self.dim,self.order,sparse=True)
+		self.assertEqual(S.shape,self.D.shape)
+		self.assertEqual(abs(S.toarray()-self.D).max(),0)
+		self.assertEqual(S.nnz,(self.order+1)*(self.dim-self.order))
+
+	def test_derivative_matrix_coefficients(self):
+		self.assertEqual(list(trendpy.globals.difference_coefficients(3)),[-1,3,-3,1])
+		self.assertEqual(list(trendpy.globals.difference_coefficients(4)),[1,-4,6,-4,1])
+
+	def test_banded_gram(self):
+		G = self.D.T.dot(self.D)
+		ab = trendpy.globals.banded_gram(self.dim,self.order)
+		for k in range(self.order+1):
+			self.assertTrue(allclose(ab[self.order-k,k:],diag(G,k)))
+
+	def test_banded_outer_gram(self):
+		G = self.D.dot(self.D.T)
+		ab = trendpy.globals.banded_outer_gram(self.dim,self.order)
+		for k in range(self.order+1):
+			self.assertTrue(allclose(ab[self.order-k,k:],diag(G,k)))
+
+	def test_banded_inverse(self):
+		weights = 1+randint(low=0,high=10,size=self.dim-self.order)
+		ab = trendpy.globals.banded_gram(self.dim,self.order,weights)
+		ab[-1] += 1
+		Z = inv(eye(self.dim)+self.D.T.dot(diag(weights)).dot(self.D))
+		band = trendpy.globals.banded_inverse(cholesky_banded(ab))
+		for k in range(self.order+1):
+			self.assertTrue(allclose(band[self.order-k,k:],diag(Z,k)))
+
+	def test_cached_operators(self):
+		S = trendpy.globals.cached_derivative_matrix(self.dim,self.order)
+		self.assertIs(trendpy.globals.cached_derivative_matrix(self.dim,self.order),S)
+		self.assertEqual(abs(S.toarray()-self.D).max(),0)
+		self.assertFalse(S.data.flags.writeable)
+		ab = trendpy.globals.cached_banded_outer_gram(self.dim,self.order)
+		self.assertTrue(allclose(ab,trendpy.globals.banded_outer_gram(self.dim,self.order)))
+		self.assertFalse(ab.flags.writeable)
+		self.assertEqual(trendpy.globals.cached_derivative_matrix.cache_info().maxsize,trendpy.globals.OPERATOR_CACHE_SIZE)
 		
 if __name__ == "__main__":
 	unittest.main()
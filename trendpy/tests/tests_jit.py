@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# tests_jit.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import inspect
+import unittest
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+from numpy import allclose, sqrt, isfinite, asarray, float32, float64
+from numpy.random import RandomState
+from scipy.linalg import cholesky_banded, cho_solve_banded
+from scipy.stats import invgauss, kstest
+
+import trendpy
+import trendpy.globals
+import trendpy.jit
+import trendpy.mcmc
+import trendpy.samplers
+from trendpy.tests import noisy_sine
+
+class ShrunkL1(trendpy.samplers.L1):
+	""" L1 sampler with a fixed noise variance."""
+
+	def generate(self, parameter_name, parameters=None):
+		if parameter_name == 'sigma2':
+			return asarray(0.01)[()]
+		return trendpy.samplers.L1.generate(self,parameter_name,parameters)
+
+class TestJit(unittest.TestCase):
+	""" Without numba the kernels run as plain Python, so they are only
+		tested on short series.
+	"""
+
+	def setUp(self):
+		self.data = noisy_sine(30)
+
+	def tearDown(self):
+		self.data = None
+
+	def test_banded_solves(self):
+		random = RandomState(1)
+		for order in (1,2,3):
+			ab = trendpy.globals.banded_gram(30,order,1+random.rand(30-order))
+			ab[-1] += 1
+			(positive, cb) = trendpy.jit.banded_cholesky(ab)
+			self.assertTrue(positive)
+			self.assertTrue(allclose(cb,cholesky_banded(ab)))
+			b = random.standard_normal(30)
+			x = trendpy.jit.backward_substitution(cb,trendpy.jit.forward_substitution(cb,b))
+			self.assertTrue(allclose(x,cho_solve_banded((cb,False),b)))
+		self.assertFalse(trendpy.jit.banded_cholesky(-ab)[0])
+
+	def test_wald(self):
+		# the means of 1/omega are often 1e9 times their shape
+		for (mean, shape) in ((1.,2.),(1e17,1e8)):
+			draws = asarray([trendpy.jit._wald(mean,shape) for _ in range(5000)])
+			self.assertTrue((draws > 0).all())
+			self.assertGreater(kstest(draws/shape,invgauss(mean/shape).cdf).pvalue,1e-3)
+
+	def test_sweep_matches_gibbs_in_distribution(self):
+		sampler = trendpy.samplers.L1(self.data,seed=2)
+		for name in sampler.parameters.hierarchy:
+			sampler.parameters.list[name].current_value = sampler.initial_value(name)
+		state = {name : sampler.parameters.list[name].current_value for name in sampler.parameters.hierarchy}
+		draws = {'numpy' : [], 'numba' : []}
+		for backend in draws:
+			sampler.backend = backend
+			for _ in range(300):
+				for (name, value) in state.items():
+					sampler.parameters.list[name].current_value = value
+				if backend == 'numba':
+					values = sampler.sweep()
+				else:
+					values = {}
+					for name in sampler.parameters.hierarchy:
+						values[name] = sampler.parameters.list[name].current_value = sampler.generate(name)
+				draws[backend].append([values['trend'][15],values['sigma2'],values['lambda2']])
+		(gibbs, sweep) = (asarray(draws['numpy']), asarray(draws['numba']))
+		error = sqrt((gibbs.var(axis=0)+sweep.var(axis=0))/300)
+		self.assertTrue((abs(gibbs.mean(axis=0)-sweep.mean(axis=0)) < 4*error).all())
+
+	def test_mcmc_uses_sweep(self):
+		sampler = trendpy.samplers.L1(self.data,seed=3)
+		sampler.backend = 'numba'
+		mcmc = trendpy.mcmc.MCMC(sampler)
+		mcmc.run(5,5,0,stats=True)
+		self.assertEqual(set(mcmc.stats.generate_time),{'sweep'})
+		for trace in mcmc.simulations.values():
+			self.assertTrue(isfinite(trace).all())
+
+	def test_overridden_draws_are_kept(self):
+		sampler = ShrunkL1(self.data,seed=3)
+		sampler.backend = 'numba'
+		mcmc = trendpy.mcmc.MCMC(sampler)
+		mcmc.run(5,5,0,stats=True)
+		self.assertEqual(set(mcmc.stats.generate_time),set(sampler.parameters.hierarchy))
+		self.assertTrue((mcmc.simulations['sigma2'] == 0.01).all())
+
+	@unittest.skipUnless(trendpy.jit.NUMBA_AVAILABLE,"numba is not installed")
+	def test_compiled_run(self):
+		sampler = trendpy.samplers.L1(self.data,seed=4,backend='numba')
+		mcmc = trendpy.mcmc.MCMC(sampler)
+		mcmc.run(50,5,0,stats=True)
+		self.assertEqual(set(mcmc.stats.generate_time),{'sweep'})
+		for trace in mcmc.simulations.values():
+			self.assertTrue(isfinite(trace).all())
+		trend = trendpy.filter(self.data,number_simulations=60,burns=20,seed=4,backend='numba')
+		self.assertEqual(trend.shape,(30,1))
+		gibbs = trendpy.mcmc.MCMC(trendpy.samplers.L1(self.data))
+		gibbs.run(60,5,0,seed=4)
+		self.assertTrue(sqrt(((trend-gibbs.output(20,'trend'))**2).mean()) < 0.15)
+		for dtype in (None,float32):
+			types = {}
+			for backend in ('numpy','numba'):
+				mcmc = trendpy.mcmc.MCMC(trendpy.samplers.L1(self.data,dtype=dtype,backend=backend))
+				sample = next(mcmc.iter_samples(1,seed=4))
+				types[backend] = {name : (type(value),value.dtype) for (name, value) in sample.items()}
+			self.assertEqual(types['numpy'],types['numba'])
+			self.assertEqual(types['numba']['sigma2'],(float32,float32) if dtype is float32 else (float64,float64))
+
+	def test_backend_selection(self):
+		self.assertRaises(ValueError,trendpy.samplers.L1,self.data,backend='fortran')
+		self.assertEqual(trendpy.samplers.L1(self.data).backend,'numpy')
+		if trendpy.jit.NUMBA_AVAILABLE:
+			self.assertEqual(trendpy.samplers.L1(self.data,backend='numba').backend,'numba')
+		else:
+			self.assertRaises(ValueError,trendpy.samplers.L1,self.data,backend='numba')
+
+if __name__ == "__main__":
+	unittest.main()
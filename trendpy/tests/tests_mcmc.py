@@ -33,8 +33,17 @@ current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentfra
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0,parent_dir)
 
+import io
+import tempfile
+import contextlib
+
+from copy import deepcopy
+
+from numpy import allclose
+
 import trendpy.mcmc
 import trendpy.samplers
+from trendpy.tests import noisy_sine
 
 class TestMCMC(unittest.TestCase):
 
@@ -55,6 +64,163 @@ class TestMCMC(unittest.TestCase):
 	def test_generate(self):
 		self.assertEqual(self.s.generate,self.mcmc.sampler.generate)
 
+class TestMultipleChains(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+
+	def tearDown(self):
+		self.sampler = None
+
+	def test_chains_axis(self):
+		mcmc = trendpy.mcmc.MCMC(self.sampler)
+		mcmc.run(20,5,0,chains=3,seed=1)
+		self.assertEqual(mcmc.simulations['trend'].shape,(60,1,20,3))
+		self.assertEqual(mcmc.output(10,'trend').shape,(60,1))
+		self.assertEqual(mcmc.rhat(10,'sigma2').shape,(1,1))
+
+	def test_seeded_chains_are_reproducible(self):
+		first = trendpy.mcmc.MCMC(self.sampler)
+		first.run(10,5,0,chains=2,seed=1)
+		second = trendpy.mcmc.MCMC(self.sampler)
+		second.run(10,5,0,chains=2,seed=1)
+		self.assertTrue(allclose(first.simulations['trend'],second.simulations['trend']))
+		self.assertFalse(allclose(first.simulations['trend'][...,0],first.simulations['trend'][...,1]))
+
+class TestIterSamples(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+
+	def tearDown(self):
+		self.sampler = None
+
+	def test_samples_match_run(self):
+		mcmc = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		mcmc.run(15,5,0,seed=4)
+		iterator = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		samples = list(iterator.iter_samples(15,seed=4))
+		self.assertEqual(len(samples),15)
+		for (i, sample) in enumerate(samples):
+			self.assertTrue(allclose(sample['trend'],mcmc.simulations['trend'][:,0,i]))
+			self.assertTrue(allclose(sample['sigma2'],mcmc.simulations['sigma2'][0,0,i]))
+
+	def test_early_stop(self):
+		mcmc = trendpy.mcmc.MCMC(self.sampler)
+		for sample in mcmc.iter_samples(seed=4):
+			if mcmc.iteration == 7:
+				break
+		self.assertEqual(mcmc.iteration,7)
+		self.assertIsNone(mcmc.simulations)
+
+class TestCheckpoint(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+		self.path = os.path.join(tempfile.mkdtemp(),'chain.pkl')
+
+	def tearDown(self):
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		self.sampler = None
+
+	def test_resume_matches_uninterrupted_run(self):
+		full = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		full.run(20,5,0,seed=3)
+		interrupted = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		interrupted.run(12,5,0,seed=3,checkpoint=self.path,checkpoint_every=5)
+		resumed = trendpy.mcmc.MCMC.load(self.path)
+		self.assertEqual(resumed.iteration,12)
+		resumed.run(20,5,0,resume=True)
+		self.assertEqual(resumed.simulations['trend'].shape,(60,1,20))
+		self.assertTrue(allclose(full.simulations['trend'],resumed.simulations['trend']))
+
+class TestRunStats(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+
+	def tearDown(self):
+		self.sampler = None
+
+	def test_stats(self):
+		mcmc = trendpy.mcmc.MCMC(self.sampler)
+		mcmc.run(10,5,0,seed=1,stats=True)
+		self.assertEqual(mcmc.stats.steps,10)
+		self.assertEqual(set(mcmc.stats.generate_time),set(self.sampler.parameters.hierarchy))
+		self.assertTrue(mcmc.stats.steps_per_second > 0)
+		self.assertEqual(mcmc.stats.peak_trace_memory,sum(trace.nbytes for trace in mcmc.simulations.values()))
+
+	def test_callback_does_not_change_draws(self):
+		plain = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		plain.run(10,5,0,seed=1)
+		calls = []
+		instrumented = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		instrumented.run(10,5,0,seed=1,callback=lambda iteration, stats: calls.append(iteration))
+		self.assertIsNone(plain.stats)
+		self.assertEqual(calls,list(range(1,11)))
+		self.assertTrue(allclose(plain.simulations['trend'],instrumented.simulations['trend']))
+
+	def test_verbose_progress(self):
+		logger = trendpy.mcmc.logger
+		propagate = logger.propagate
+		logger.propagate = False
+		try:
+			output = io.StringIO()
+			with contextlib.redirect_stdout(output):
+				trendpy.mcmc.MCMC(deepcopy(self.sampler)).run(3,5,1,seed=1)
+			# printed when logging is not configured
+			self.assertEqual(output.getvalue().split('\n')[:3],['== step 1 ==','== step 2 ==','== step 3 =='])
+			output = io.StringIO()
+			with contextlib.redirect_stdout(output), self.assertLogs(logger,level='INFO') as logs:
+				trendpy.mcmc.MCMC(deepcopy(self.sampler)).run(3,5,1,seed=1)
+			self.assertEqual(output.getvalue(),'')
+			self.assertEqual(len(logs.records),3)
+		finally:
+			logger.propagate = propagate
+
+class FailingL1(trendpy.samplers.L1):
+	""" L1 sampler whose draws of one parameter fail a given number of times."""
+
+	def __init__(self, data, parameter_name, failures):
+		trendpy.samplers.L1.__init__(self,data)
+		self.parameter_name = parameter_name
+		self.failures = failures
+		self.draws = {}
+
+	def generate(self, parameter_name, parameters=None):
+		self.draws[parameter_name] = self.draws.get(parameter_name,0)+1
+		if parameter_name == self.parameter_name and self.failures > 0:
+			self.failures -= 1
+			return float('nan')
+		return trendpy.samplers.L1.generate(self,parameter_name,parameters)
+
+class TestRetry(unittest.TestCase):
+
+	def setUp(self):
+		self.data = noisy_sine()
+
+	def tearDown(self):
+		self.data = None
+
+	def test_only_failed_parameter_is_redrawn(self):
+		sampler = FailingL1(self.data,'lambda2',3)
+		mcmc = trendpy.mcmc.MCMC(sampler)
+		mcmc.run(2,5,0,seed=1,stats=True)
+		self.assertEqual(sampler.draws,{'trend' : 2, 'sigma2' : 2, 'lambda2' : 5, 'omega' : 2})
+		self.assertEqual(mcmc.stats.restarts,{'lambda2' : 3})
+
+	def test_failed_parameter_is_reported(self):
+		mcmc = trendpy.mcmc.MCMC(FailingL1(self.data,'omega',10))
+		with self.assertRaises(trendpy.mcmc.ConvergenceError) as context:
+			mcmc.run(2,5,0,seed=1)
+		self.assertEqual(context.exception.parameter_name,'omega')
+		self.assertIsInstance(context.exception,ValueError)
+
 if __name__ == "__main__":
 	unittest.main()
 	
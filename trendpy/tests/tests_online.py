@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# tests_online.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+import os
+import sys
+import inspect
+import unittest
+
+from numpy import sin, linspace, allclose, diff, abs as absolute
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+import trendpy.online
+from trendpy.tests import noisy_sine
+
+class TestOnlineFilter(unittest.TestCase):
+
+	def setUp(self):
+		self.data = noisy_sine(80)
+		self.online = trendpy.online.OnlineFilter(window=50,number_simulations=20,burns=10,seed=2)
+
+	def tearDown(self):
+		self.data = None
+		self.online = None
+
+	def test_short_history_is_not_filtered(self):
+		trend = self.online.update(self.data[:3])
+		self.assertTrue(allclose(trend,self.data[:3]))
+
+	def test_window_slides(self):
+		self.online.update(self.data[:60])
+		self.assertEqual(len(self.online.observations),50)
+		for value in self.data[60:65]:
+			trend = self.online.update(value)
+		self.assertEqual(len(trend),65)
+		self.assertEqual(len(self.online),65)
+		self.assertEqual(len(self.online.frozen),15)
+		self.assertEqual(self.online.state['omega'].shape,(48,))
+
+	def test_history_longer_than_window(self):
+		trend = self.online.update(self.data)
+		# observations that never were in the window are filtered too
+		self.assertLess(absolute(diff(trend[:30],2)).max(),0.1*absolute(diff(self.data[:30],2)).max())
+		self.assertEqual(len(self.online.frozen),30)
+		self.assertEqual(self.online.state['trend'].shape,(50,))
+
+class TestRollingFilter(unittest.TestCase):
+
+	def setUp(self):
+		self.data = noisy_sine(120)
+
+	def tearDown(self):
+		self.data = None
+
+	def test_end_of_window_values(self):
+		trend = trendpy.online.rolling_filter(self.data,50,step=10,number_simulations=20,burns=10,seed=1)
+		self.assertEqual(trend.shape,(8,))
+		self.assertTrue(allclose(trend,sin(linspace(0,6,120))[49::10],atol=0.3))
+
+	def test_blocks(self):
+		trend = trendpy.online.rolling_filter(self.data,50,step=10,number_simulations=20,burns=10,n_jobs=2,seed=1)
+		self.assertEqual(trend.shape,(8,))
+
+	def test_window_too_long(self):
+		self.assertRaises(ValueError,trendpy.online.rolling_filter,self.data,200)
+
+if __name__ == "__main__":
+	unittest.main()
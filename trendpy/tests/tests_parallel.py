@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# tests_parallel.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import inspect
+import unittest
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+from numpy import sin, linspace, allclose, arange
+from numpy.random import RandomState
+
+import trendpy
+import trendpy.parallel
+
+class TestSegments(unittest.TestCase):
+
+	def setUp(self):
+		self.truth = sin(linspace(0,6,500))
+		self.data = self.truth+0.1*RandomState(0).standard_normal(500)
+
+	def tearDown(self):
+		self.truth = None
+		self.data = None
+
+	def test_segment_bounds(self):
+		bounds = trendpy.parallel.segment_bounds(500,120,20)
+		self.assertEqual(bounds[0][0],0)
+		self.assertEqual(bounds[-1][1],500)
+		for ((start, end), (next_start, next_end)) in zip(bounds[:-1],bounds[1:]):
+			self.assertEqual(end-start,120)
+			self.assertGreaterEqual(end-next_start,20)
+		self.assertEqual(trendpy.parallel.segment_bounds(100,120,20),[(0,100)])
+		self.assertRaises(ValueError,trendpy.parallel.segment_bounds,500,120,120)
+
+	def test_stitch_segments(self):
+		series = arange(500.)
+		bounds = trendpy.parallel.segment_bounds(500,120,30)
+		self.assertTrue(allclose(trendpy.parallel.stitch_segments([series[start:end] for (start, end) in bounds],bounds),series))
+
+	def test_filter(self):
+		trend = trendpy.filter(self.data,number_simulations=40,burns=20,seed=1,segment_length=150,overlap=30)
+		self.assertEqual(trend.shape,(500,1))
+		self.assertTrue(allclose(trend.ravel(),self.truth,atol=0.1))
+		self.assertTrue(allclose(trend,trendpy.filter(self.data,number_simulations=40,burns=20,seed=1,segment_length=150,overlap=30,n_jobs=2)))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# tests_rng.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+import os
+import sys
+import inspect
+import unittest
+
+from numpy import allclose
+from scipy.stats import kstest, norm, gamma, invgamma, invgauss
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+import trendpy.rng
+
+class TestRandomGenerator(unittest.TestCase):
+
+	def setUp(self):
+		self.random = trendpy.rng.RandomGenerator(seed=0)
+
+	def tearDown(self):
+		self.random = None
+
+	def test_distributions_match_scipy(self):
+		for (distribution, args) in [(norm,(1.,2.)),(gamma,(3.,0.5,2.)),(invgamma,(4.,0.,3.)),(invgauss,(0.7,0.,2.5))]:
+			draws = self.random.rvs(distribution,*args,size=20000)
+			self.assertGreater(kstest(draws,distribution(*args).cdf).pvalue,1e-3)
+
+	def test_seed_is_reproducible(self):
+		other = trendpy.rng.RandomGenerator(seed=0)
+		self.assertTrue(allclose(self.random.invgauss(2.,scale=3.,size=10),other.invgauss(2.,scale=3.,size=10)))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+# tests_samplers.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+import os
+import sys
+import inspect
+import unittest
+
+from numpy import eye, diag, allclose, cumsum, sin, linspace, isfinite, float32, float64
+from numpy.random import randn, seed
+from numpy.linalg import solve
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+import trendpy.globals
+import trendpy.mcmc
+import trendpy.samplers
+import trendpy.storage
+
+class TestL1(unittest.TestCase):
+
+	def setUp(self):
+		seed(0)
+		self.data = cumsum(randn(50))
+		self.sampler = trendpy.samplers.L1(self.data,total_variation_order=2)
+		for name in self.sampler.parameters.hierarchy:
+			self.sampler.parameters.list[name].current_value = self.sampler.initial_value(name)
+
+	def tearDown(self):
+		self.data = None
+		self.sampler = None
+
+	def test_trend_mean(self):
+		D = trendpy.globals.derivative_matrix(50,2)
+		omega = self.sampler.parameters.list['omega'].current_value
+		expected = solve(eye(50)+D.T.dot(diag(1/omega)).dot(D),self.data)
+		self.assertTrue(allclose(self.sampler.distribution_parameters('trend')['mean'],expected))
+
+	def test_generate_shapes(self):
+		for name in self.sampler.parameters.hierarchy:
+			value = self.sampler.generate(name)
+			self.assertEqual(value.size,self.sampler.parameters.list[name].size[0])
+
+	def test_cache_invalidation(self):
+		first = self.sampler.precision_cholesky()
+		self.assertIs(self.sampler.precision_cholesky(),first)
+		self.sampler.parameters.list['trend'].current_value = self.sampler.generate('trend')
+		self.assertIs(self.sampler.precision_cholesky(),first)
+		self.sampler.parameters.list['omega'].current_value = self.sampler.initial_value('omega')
+		self.assertIsNot(self.sampler.precision_cholesky(),first)
+
+	def test_shared_operator(self):
+		other = trendpy.samplers.L1(randn(50),total_variation_order=2)
+		self.assertIs(other.derivative_matrix,self.sampler.derivative_matrix)
+
+	def test_omega_on_flat_trend(self):
+		# zero differences used to give an infinite mean to 1/omega
+		self.sampler.parameters.list['trend'].current_value = linspace(0,1,50)
+		omega = self.sampler.generate('omega')
+		self.assertTrue(isfinite(omega).all())
+		self.assertTrue((omega >= self.sampler.omega_bounds[0]).all() and (omega <= self.sampler.omega_bounds[1]).all())
+		self.sampler.parameters.list['omega'].current_value = omega
+		self.assertTrue(isfinite(self.sampler.generate('trend')).all())
+
+	def test_single_precision(self):
+		sampler = trendpy.samplers.L1(self.data,total_variation_order=2,dtype=float32,seed=1)
+		mcmc = trendpy.mcmc.MCMC(sampler)
+		mcmc.run(10,5,0,storage=trendpy.storage.MemoryStorage())
+		self.assertEqual(sampler.data.dtype,float32)
+		for name in ('trend','omega'):
+			self.assertEqual(sampler.parameters.list[name].current_value.dtype,float32)
+			self.assertEqual(mcmc.simulations[name].dtype,float32)
+		# the factorization of the precision stays in double precision
+		self.assertEqual(sampler.precision_cholesky().dtype,float64)
+
+class TestBatchL1(unittest.TestCase):
+
+	def setUp(self):
+		seed(0)
+		self.data = sin(linspace(0,6,60))[:,None]+0.1*randn(60,3)
+
+	def tearDown(self):
+		self.data = None
+
+	def test_single_series_matches_l1(self):
+		single = trendpy.mcmc.MCMC(trendpy.samplers.L1(self.data[:,0]))
+		single.run(10,5,0,seed=2)
+		batch = trendpy.mcmc.MCMC(trendpy.samplers.BatchL1(self.data[:,:1]))
+		batch.run(10,5,0,seed=2)
+		self.assertTrue(allclose(single.simulations['trend'],batch.simulations['trend']))
+		self.assertTrue(allclose(single.simulations['omega'],batch.simulations['omega']))
+
+	def test_output_shape(self):
+		mcmc = trendpy.mcmc.MCMC(trendpy.samplers.BatchL1(self.data))
+		mcmc.run(10,5,0,seed=2)
+		self.assertEqual(mcmc.output(5,'trend').shape,self.data.shape)
+		self.assertEqual(mcmc.simulations['sigma2'].shape,(1,3,10))
+
+if __name__ == "__main__":
+	unittest.main()
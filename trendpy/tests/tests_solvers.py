@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# tests_solvers.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import inspect
+import warnings
+import unittest
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+from numpy import sin, linspace, allclose, sqrt, mean, abs as absolute
+from numpy.random import RandomState
+
+import trendpy
+import trendpy.solvers
+
+from trendpy.globals import derivative_matrix
+from trendpy.tests import noisy_sine
+
+class TestL1PDIP(unittest.TestCase):
+
+	def setUp(self):
+		self.data = noisy_sine(200)
+
+	def tearDown(self):
+		self.data = None
+
+	def objective(self, trend, penalty, order):
+		return 0.5*((self.data-trend)**2).sum()+penalty*absolute(derivative_matrix(len(trend),order).dot(trend)).sum()
+
+	def test_optimality(self):
+		random = RandomState(1)
+		for order in (1,2,3):
+			solver = trendpy.solvers.L1PDIP(self.data,total_variation_order=order)
+			penalty = 0.01*solver.penalty_max
+			trend = solver.solve(penalty)
+			value = self.objective(trend,penalty,order)
+			for _ in range(20):
+				self.assertLessEqual(value,self.objective(trend+1e-3*random.standard_normal(len(trend)),penalty,order)*(1+1e-5))
+
+	def test_penalty_max(self):
+		solver = trendpy.solvers.L1PDIP(self.data,total_variation_order=2)
+		trend = solver.solve(1.01*solver.penalty_max)
+		self.assertTrue(allclose(derivative_matrix(len(trend),2).dot(trend),0,atol=1e-4))
+
+	def test_filter(self):
+		trend = trendpy.filter(self.data,method="L1PDIP",penalty=1.)
+		# same shape as the trends of the samplers and of the segments
+		self.assertEqual(trend.shape,(200,1))
+		self.assertEqual(trendpy.filter(self.data,method="L1PDIP",penalty=1.,segment_length=120,overlap=20).shape,(200,1))
+		self.assertTrue(allclose(trend.ravel(),trendpy.solvers.L1PDIP(self.data,penalty=1.).solve()))
+
+	def test_deprecated_name(self):
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			trend = trendpy.filter(self.data,method="L1ADMM",penalty=1.)
+		self.assertTrue(any(issubclass(warning.category,DeprecationWarning) for warning in caught))
+		self.assertTrue(allclose(trend,trendpy.filter(self.data,method="L1PDIP",penalty=1.)))
+
+	def test_path(self):
+		solver = trendpy.solvers.L1PDIP(self.data,total_variation_order=2)
+		(penalties, trends, degrees_of_freedom) = solver.path(number=6)
+		self.assertEqual(trends.shape,(200,6))
+		self.assertTrue((penalties[1:] < penalties[:-1]).all())
+		self.assertTrue(abs(degrees_of_freedom[0]-2) < 1)
+		self.assertTrue(degrees_of_freedom[-1] > degrees_of_freedom[0])
+		# the warm started fits reach the solutions of fits from scratch
+		for order in (1,2,3):
+			solver = trendpy.solvers.L1PDIP(self.data,total_variation_order=order)
+			(penalties, trends, degrees_of_freedom) = solver.path(number=6,tolerance=1e-5)
+			for (penalty, trend) in zip(penalties,trends.T):
+				self.assertTrue(allclose(trend,solver.solve(penalty),atol=2e-3))
+
+	def test_select(self):
+		solver = trendpy.solvers.L1PDIP(self.data,total_variation_order=2)
+		(penalty, trend) = solver.select('bic')
+		self.assertTrue(1e-4*solver.penalty_max <= penalty <= solver.penalty_max)
+		# the loose fit carried on matches a fit from scratch
+		self.assertTrue(allclose(trend,solver.solve(penalty),atol=1e-4))
+		self.assertLess(sqrt(mean((trend-sin(linspace(0,6,200)))**2)),0.05)
+		(penalties, trends, degrees_of_freedom) = solver.path(number=10)
+		self.assertEqual(solver.select('bic',penalties=penalties[:1])[0],penalties[0])
+		self.assertTrue(allclose(solver.select('bic')[1],trendpy.filter(self.data,method="L1PDIP",penalty='bic').ravel()))
+		self.assertRaises(ValueError,solver.select,'cv')
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# tests_startup.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import inspect
+import unittest
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+script = """
+import sys
+from time import perf_counter
+start = perf_counter()
+import trendpy
+print(perf_counter()-start)
+print(' '.join(sorted(set(name.split('.')[0] for name in sys.modules))))
+"""
+
+class TestStartup(unittest.TestCase):
+
+	#: bound on the import time, in seconds (it takes a few milliseconds)
+	max_import_time = 0.25
+
+	def import_trendpy(self):
+		output = subprocess.check_output([sys.executable,'-c',script],cwd=parent_dir,universal_newlines=True).split('\n')
+		return (float(output[0]), output[1].split())
+
+	def test_import_time(self):
+		# the best of a few runs, so that a busy machine does not fail the test
+		self.assertLess(min(self.import_trendpy()[0] for _ in range(3)),self.max_import_time)
+
+	def test_heavy_dependencies_are_not_imported(self):
+		modules = self.import_trendpy()[1]
+		for name in ('numpy','scipy','pandas'):
+			self.assertNotIn(name,modules)
+
+	def test_numba_is_not_imported(self):
+		# numba is only loaded by the samplers asked for the numba backend
+		script = "import sys, trendpy.samplers, trendpy.solvers; print('numba' in sys.modules)"
+		output = subprocess.check_output([sys.executable,'-c',script],cwd=parent_dir,universal_newlines=True)
+		self.assertEqual(output.strip(),'False')
+
+	def test_lazy_attributes(self):
+		import trendpy
+		import trendpy.mcmc
+		self.assertIs(trendpy.MCMC,trendpy.mcmc.MCMC)
+		self.assertEqual(trendpy.derivative_matrix(5,1).shape,(4,5))
+		self.assertIn('SamplerFactory',dir(trendpy))
+		self.assertRaises(AttributeError,getattr,trendpy,'missing')
+
+	def test_star_import(self):
+		namespace = {}
+		exec('from trendpy import *',namespace)
+		for name in ('filter','filter_many','derivative_matrix','tosequence','SamplerFactory','MCMC'):
+			self.assertIn(name,namespace)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# tests_storage.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+
+from copy import deepcopy
+
+from numpy import allclose, memmap, float32
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+import trendpy.mcmc
+import trendpy.diagnostics
+import trendpy.samplers
+import trendpy.storage
+from trendpy.tests import noisy_sine
+
+class TestDiskStorage(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+		self.sampler = None
+
+	def test_disk_traces_match_memory_traces(self):
+		memory = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		memory.run(25,5,0,seed=1)
+		disk = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		disk.run(25,5,0,seed=1,storage=trendpy.storage.DiskStorage(self.directory,chunk_size=10))
+		self.assertIsInstance(disk.simulations['trend'],memmap)
+		self.assertTrue(os.path.exists(os.path.join(self.directory,'trend.npy')))
+		for name in memory.simulations:
+			self.assertTrue(allclose(memory.simulations[name],disk.simulations[name]))
+		self.assertTrue(allclose(memory.output(10,'trend'),disk.output(10,'trend')))
+
+	def test_disk_checkpoint_is_extended(self):
+		path = os.path.join(self.directory,'chain.pkl')
+		disk = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		disk.run(15,5,0,seed=1,checkpoint=path,storage=trendpy.storage.DiskStorage(self.directory,chunk_size=4))
+		resumed = trendpy.mcmc.MCMC.load(path)
+		resumed.run(30,5,0,resume=True)
+		memory = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		memory.run(30,5,0,seed=1)
+		self.assertEqual(resumed.simulations['omega'].shape,(58,1,30))
+		self.assertTrue(allclose(memory.simulations['trend'],resumed.simulations['trend']))
+
+	def test_stopped_disk_run_is_loaded_trimmed(self):
+		path = os.path.join(self.directory,'chain.pkl')
+		rule = trendpy.diagnostics.StoppingRule('mcse',0.5,parameter='sigma2',burn=10,check_every=25)
+		disk = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		disk.run(500,5,0,seed=1,checkpoint=path,storage=trendpy.storage.DiskStorage(self.directory,chunk_size=10),stopping_rule=rule)
+		self.assertTrue(disk.converged)
+		loaded = trendpy.mcmc.MCMC.load(path)
+		self.assertEqual(loaded.iteration,disk.iteration)
+		for name in disk.simulations:
+			self.assertEqual(loaded.simulations[name].shape,disk.simulations[name].shape)
+		self.assertTrue(allclose(loaded.output(10,'trend'),disk.output(10,'trend')))
+		loaded.run(disk.iteration+10,5,0,resume=True)
+		self.assertEqual(loaded.simulations['trend'].shape,(60,1,disk.iteration+10))
+		self.assertTrue(allclose(loaded.simulations['trend'][:,:,:disk.iteration],disk.simulations['trend']))
+
+	def test_single_precision_traces(self):
+		double = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		double.run(15,5,0,seed=1)
+		single = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		single.run(15,5,0,seed=1,storage=trendpy.storage.DiskStorage(self.directory,chunk_size=4),dtype=float32)
+		single.run(20,5,0,resume=True)
+		self.assertEqual(single.simulations['trend'].dtype,float32)
+		self.assertEqual(single.simulations['trend'].shape,(60,1,20))
+		self.assertTrue(allclose(double.simulations['trend'],single.simulations['trend'][:,:,:15],atol=1e-5))
+
+class TestSummaryStorage(unittest.TestCase):
+
+	def setUp(self):
+		data = noisy_sine()
+		self.sampler = trendpy.samplers.L1(data)
+
+	def tearDown(self):
+		self.sampler = None
+
+	def test_summary_matches_trace(self):
+		memory = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		memory.run(30,5,0,seed=1)
+		summary = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		summary.run(30,5,0,seed=1,storage=trendpy.storage.SummaryStorage(10))
+		self.assertTrue(allclose(memory.output(10,'trend'),summary.output(10,'trend')))
+		self.assertTrue(allclose(memory.simulations['sigma2'][:,:,10:].var(axis=2,ddof=1),summary.simulations['sigma2'].variance))
+		self.assertRaises(ValueError,summary.output,5,'trend')
+
+	def test_summaries_of_chains_are_pooled(self):
+		memory = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		memory.run(20,5,0,chains=3,seed=1)
+		summary = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		summary.run(20,5,0,chains=3,seed=1,storage=trendpy.storage.SummaryStorage(5))
+		self.assertTrue(allclose(memory.output(5,'omega'),summary.output(5,'omega')))
+		self.assertEqual(summary.simulations['omega'].count,45)
+
+	def test_no_draw_after_burn(self):
+		self.assertRaises(ValueError,trendpy.storage.Summary((3,1),5).posterior_mean,5)
+		summary = trendpy.mcmc.MCMC(deepcopy(self.sampler))
+		self.assertRaises(ValueError,summary.run,10,5,0,storage=trendpy.storage.SummaryStorage(10))
+		self.assertIsNone(summary.simulations)
+		self.assertRaises(ValueError,trendpy.filter,noisy_sine(),number_simulations=10,burns=10)
+
+if __name__ == "__main__":
+	unittest.main()
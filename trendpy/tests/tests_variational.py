@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# tests_variational.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import inspect
+import unittest
+
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0,parent_dir)
+
+from numpy import sin, linspace, sqrt, mean, isfinite
+from numpy.random import RandomState
+
+import trendpy.mcmc
+import trendpy.samplers
+import trendpy.variational
+
+class TestVariationalBayes(unittest.TestCase):
+
+	def setUp(self):
+		self.truth = sin(linspace(0,6,300))
+		self.data = self.truth+0.1*RandomState(0).standard_normal(300)
+
+	def tearDown(self):
+		self.truth = None
+		self.data = None
+
+	def test_run(self):
+		for order in (1,2,3):
+			vb = trendpy.variational.VariationalBayes(trendpy.samplers.L1(self.data,total_variation_order=order))
+			self.assertTrue(vb.run())
+			# like the sampler, first order differences flatten this trend
+			if order > 1:
+				self.assertLess(sqrt(mean((vb.output('trend')-self.truth)**2)),0.05)
+				self.assertTrue(0.005 < vb.output('sigma2') < 0.02)
+
+	def test_matches_gibbs(self):
+		vb = trendpy.variational.VariationalBayes(trendpy.samplers.L1(self.data))
+		vb.run()
+		mcmc = trendpy.mcmc.MCMC(trendpy.samplers.L1(self.data,seed=1))
+		mcmc.run(1200,5,0)
+		self.assertLess(sqrt(mean((vb.output('trend')-mcmc.output(200,'trend').ravel())**2)),0.005)
+		self.assertLess(abs(vb.output('sigma2')/mcmc.output(200,'sigma2').item()-1),0.1)
+		self.assertLess(abs(vb.output('lambda2')/mcmc.output(200,'lambda2').item()-1),0.02)
+
+	def test_moments(self):
+		vb = trendpy.variational.VariationalBayes(trendpy.samplers.L1(self.data))
+		vb.run()
+		for name in ('trend','sigma2','lambda2','omega'):
+			self.assertTrue(isfinite(vb.output(name)).all())
+			self.assertTrue((vb.variance(name) > 0).all())
+		self.assertEqual(vb.output('trend').shape,self.data.shape)
+		self.assertEqual(vb.variance('trend').shape,self.data.shape)
+		self.assertEqual(vb.output('omega').shape,(len(self.data)-2,))
+
+	def test_batch(self):
+		vb = trendpy.variational.VariationalBayes(trendpy.samplers.BatchL1(self.data))
+		self.assertRaises(NotImplementedError,vb.run)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# variational.py
+
+# MIT License
+
+# Copyright (c) 2017 Rene Jean Corneille
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import logging
+
+from numpy import abs as absolute
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['VariationalBayes']
+
+class VariationalBayes(object):
+	""" Mean-field variational approximation of the posterior of a sampler.
+
+	The parameters defined by the sampler are updated in turn, each one
+	being given the moments of the approximate posterior of the others
+	(coordinate ascent), until the posterior means stabilize. It usually
+	converges in ten to twenty iterations and keeps no draws, only the
+	current moments.
+
+	:param sampler: sampler defining the model, which must implement
+		`initial_moments` and `variational_update`.
+	:type sampler: `trendpy.samplers.Sampler`
+	"""
+
+	def __init__(self, sampler):
+		self.sampler = sampler
+		self.moments = {}
+		self.iterations = 0
+		self.converged = False
+
+	def define_parameters(self):
+		""" Method to set the parameter set to be approximated."""
+		return self.sampler.define_parameters()
+
+	def run(self, max_iterations=30, tolerance=1e-4, verbose=0):
+		""" Runs the coordinate ascent iterations.
+
+		:param max_iterations: maximum number of sweeps over the parameters.
+		:type max_iterations: int, optional
+		:param tolerance: stops when the largest change of the posterior mean
+			of every parameter is below tolerance times its largest value.
+		:type tolerance: float, optional
+		:param verbose: control console log information detail.
+		:type verbose: int, optional
+		:return: whether the iterations converged
+		:rtype: bool
+		"""
+		hierarchy = self.sampler.parameters.hierarchy
+		self.moments = {name : self.sampler.initial_moments(name) for name in hierarchy}
+		self.converged = False
+		previous = None
+		for self.iterations in range(1,max_iterations+1):
+			for name in hierarchy:
+				self.moments[name] = self.sampler.variational_update(name,self.moments)
+			current = [self.moments[name]['mean'] for name in hierarchy]
+			if previous is not None:
+				change = max(absolute(new-old).max()/max(absolute(new).max(),1e-300) for (new, old) in zip(current,previous))
+				if verbose > 0:
+					logger.info("Iteration %i: relative change %g", self.iterations, change)
+				if change < tolerance:
+					self.converged = True
+					break
+			previous = current
+		return self.converged
+
+	def output(self, parameter_name):
+		""" Approximate posterior mean of a parameter.
+
+		:param parameter_name: name of the parameter of interest
+		:type parameter_name: string
+		:return: posterior mean
+		:rtype: `Numpy.dnarray`
+		"""
+		return self.moments[parameter_name]['mean']
+
+	def variance(self, parameter_name):
+		""" Approximate posterior variance of a parameter.
+
+		:param parameter_name: name of the parameter of interest
+		:type parameter_name: string
+		:return: posterior variance
+		:rtype: `Numpy.dnarray`
+		"""
+		return self.moments[parameter_name]['variance']